@@ -1,6 +1,12 @@
-from typer import Typer
+import json
+from typing import Optional
 
+import pytest
+from typer import Option, Typer
+
+from commands.benchmark.main import run_benchmark
 from commands.init_database.main import init_database
+from commands.snapshot.main import export_snapshot, import_snapshot
 
 app = Typer()
 
@@ -14,8 +20,57 @@ def cmd_init_database():
 @app.command("run_test")
 def cmd_run_test():
     print("Running tests")
-    # TODO: Add test execution logic here
-    print("Tests executed successfully")
+    raise SystemExit(pytest.main(["-q", "tests"]))
+
+
+@app.command("benchmark")
+def cmd_benchmark(
+    books: int = Option(10_000, help="Number of synthetic books to seed"),
+    users: int = Option(2_000, help="Number of synthetic users to seed"),
+    rentals: int = Option(50_000, help="Number of historical rentals to seed"),
+    requests: int = Option(5_000, help="Measured requests to send"),
+    warmup: int = Option(200, help="Unmeasured warm-up requests"),
+    concurrency: int = Option(16, help="Concurrent clients"),
+    mix: Optional[str] = Option(None, help='Request mix, e.g. "browse=60,search=20,rent=12,return=8"'),
+    seed: int = Option(42, help="Random seed for data and traffic"),
+    skew: float = Option(1.1, help="Zipf exponent for book/user popularity"),
+    reset: bool = Option(False, help="Truncate books/users/rentals before seeding"),
+    skip_seed: bool = Option(False, help="Reuse previously seeded books/users (same seed/sizes); rentals are restored"),
+    output: Optional[str] = Option(None, help="Write the JSON report to this file"),
+):
+    print("Running benchmark")
+    report = run_benchmark(
+        books=books, users=users, rentals=rentals, requests=requests, warmup=warmup,
+        concurrency=concurrency, mix=mix, seed=seed, skew=skew, reset=reset, skip_seed=skip_seed,
+    )
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Benchmark report written to {output}")
+    else:
+        print(text)
+
+
+@app.command("snapshot_export")
+def cmd_snapshot_export(
+    directory: str,
+    compression: str = Option("zstd", help="Parquet codec: zstd, snappy, gzip, lz4 or none"),
+):
+    print(f"Exporting snapshot to {directory}")
+    manifest = export_snapshot(directory, compression=compression)
+    print(json.dumps(manifest["tables"], indent=2))
+
+
+@app.command("snapshot_import")
+def cmd_snapshot_import(
+    directory: str,
+    truncate: bool = Option(False, help="Truncate books/users/rentals before loading"),
+    batch_rows: int = Option(250_000, help="Rows per COPY batch"),
+):
+    print(f"Importing snapshot from {directory}")
+    result = import_snapshot(directory, truncate=truncate, batch_rows=batch_rows)
+    print(json.dumps(result, indent=2))
 
 
 if __name__ == "__main__":
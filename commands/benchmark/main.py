@@ -0,0 +1,404 @@
+import asyncio
+import json
+import math
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import UUID
+
+import psycopg
+from sqlalchemy import create_engine
+
+from src.models import Books, Users, Rental  # noqa: F401  (register tables on Base)
+from src.utils.db_utils import Base, get_database_url, get_psycopg_conninfo
+
+# word pools for synthetic titles / authors; `search` requests pick from TITLE_WORDS
+TITLE_WORDS = [
+    "river", "shadow", "garden", "winter", "silver", "empire", "letters", "island",
+    "night", "stone", "mirror", "harbor", "forest", "glass", "summer", "kingdom",
+    "secret", "storm", "journey", "city", "memory", "fire", "ocean", "house",
+]
+FIRST_NAMES = ["Anna", "Minh", "Lan", "John", "Maria", "Huy", "Sara", "Duc", "Linh", "Peter"]
+LAST_NAMES = ["Nguyen", "Tran", "Smith", "Le", "Garcia", "Pham", "Brown", "Hoang", "Vo", "Miller"]
+PUBLISHERS = [f"Publisher {i:03d}" for i in range(200)]
+
+# default request mix (weights) for the concurrent workload
+DEFAULT_MIX = {"browse": 60, "search": 20, "rent": 12, "return": 8}
+
+
+def _uuid(rng: random.Random) -> UUID:
+    return UUID(int=rng.getrandbits(128), version=4)
+
+
+def _zipf_cum_weights(n: int, s: float) -> list[float]:
+    # cumulative 1/rank^s weights, usable with rng.choices(cum_weights=...)
+    total = 0.0
+    cum = []
+    for rank in range(1, n + 1):
+        total += 1.0 / rank ** s
+        cum.append(total)
+    return cum
+
+
+def generate_dataset(books: int, users: int, rentals: int, seed: int = 42, skew: float = 1.1) -> dict:
+    """
+    Build a deterministic synthetic library in memory.
+    Book popularity and user activity follow a Zipf-like distribution with exponent `skew`,
+    so a handful of titles and patrons account for most of the rentals.
+    Active rentals never exceed a book's total copies; available_copies is derived from them.
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+
+    book_rows = []
+    for i in range(books):
+        title = " ".join(rng.sample(TITLE_WORDS, 3)).title()
+        author = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        book_rows.append([
+            _uuid(rng), f"{title} #{i}", author, rng.randint(1950, 2025),
+            rng.choice(PUBLISHERS), f"BENCH{i:010d}", rng.randint(1, 5),
+        ])
+
+    user_rows = []
+    for i in range(users):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        user_rows.append([_uuid(rng), name, f"bench.user{i}@example.com", f"09{i:08d}"])
+
+    book_weights = _zipf_cum_weights(books, skew) if books else []
+    user_weights = _zipf_cum_weights(users, skew) if users else []
+    picked_books = rng.choices(range(books), cum_weights=book_weights, k=rentals) if books and users else []
+    picked_users = rng.choices(range(users), cum_weights=user_weights, k=rentals) if books and users else []
+
+    active = [0] * books
+    rental_rows = []
+    for b, u in zip(picked_books, picked_users):
+        rented_at = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        days = rng.choice((7, 14, 14, 21, 30))
+        due_date = (rented_at + timedelta(days=days)).date()
+        age_days = (now - rented_at).days
+
+        returned_at = None
+        wants_active = rng.random() < (0.5 if age_days < 30 else 0.05)
+        if not wants_active or active[b] >= book_rows[b][6]:
+            returned_at = min(now, rented_at + timedelta(days=rng.randint(1, days + 10)))
+        else:
+            active[b] += 1
+
+        rental_rows.append([
+            _uuid(rng), book_rows[b][0], user_rows[u][0], 1, rented_at, due_date, returned_at,
+        ])
+
+    for b, row in enumerate(book_rows):
+        row.append(row[6] - active[b])  # available_copies
+
+    return {"books": book_rows, "users": user_rows, "rentals": rental_rows}
+
+
+def seed_database(dataset: dict, reset: bool = False) -> dict:
+    """
+    Bulk-load a generated dataset through COPY.
+    Refuses to touch a non-empty library unless `reset` is set, in which case
+    books/users/rentals are truncated first.
+    """
+    engine = create_engine(get_database_url())
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    timings = {}
+    with psycopg.connect(get_psycopg_conninfo()) as conn:
+        with conn.cursor() as cur:
+            if reset:
+                cur.execute("TRUNCATE rentals, users, books")
+            else:
+                cur.execute("SELECT EXISTS (SELECT 1 FROM books) OR EXISTS (SELECT 1 FROM users)")
+                if cur.fetchone()[0]:
+                    raise SystemExit("Database is not empty; re-run with --reset to replace its contents.")
+
+            now = datetime.now(timezone.utc)
+            started = time.perf_counter()
+            with cur.copy(
+                "COPY books (id, title, author, published_year, publisher, isbn, "
+                "total_copies, available_copies, created_at, updated_at) FROM STDIN"
+            ) as copy:
+                for row in dataset["books"]:
+                    copy.write_row((*row, now, now))
+            timings["books"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            with cur.copy("COPY users (id, name, email, phone, created_at, updated_at) FROM STDIN") as copy:
+                for row in dataset["users"]:
+                    copy.write_row((*row, now, now))
+            timings["users"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            with cur.copy(
+                "COPY rentals (id, book_id, user_id, quantity, rented_at, due_date, returned_at) FROM STDIN"
+            ) as copy:
+                for row in dataset["rentals"]:
+                    copy.write_row(row)
+            timings["rentals"] = time.perf_counter() - started
+
+            cur.execute("ANALYZE books, users, rentals")
+        conn.commit()
+
+    return {table: round(seconds, 3) for table, seconds in timings.items()}
+
+
+def restore_rentals(dataset: dict) -> float:
+    """
+    Put rentals and available_copies back to their seeded state without reloading
+    books/users, so a `skip_seed` run starts from the same library as a fresh seed.
+    Rentals created or closed by earlier benchmark traffic are discarded.
+    """
+    with psycopg.connect(get_psycopg_conninfo()) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM books WHERE isbn LIKE 'BENCH%'")
+            if cur.fetchone()[0] != len(dataset["books"]):
+                raise SystemExit("Seeded data does not match these sizes; re-run without --skip-seed.")
+
+            started = time.perf_counter()
+            cur.execute("TRUNCATE rentals")
+            with cur.copy(
+                "COPY rentals (id, book_id, user_id, quantity, rented_at, due_date, returned_at) FROM STDIN"
+            ) as copy:
+                for row in dataset["rentals"]:
+                    copy.write_row(row)
+
+            cur.execute("CREATE TEMP TABLE bench_available (id uuid PRIMARY KEY, available_copies int) ON COMMIT DROP")
+            with cur.copy("COPY bench_available (id, available_copies) FROM STDIN") as copy:
+                for row in dataset["books"]:
+                    copy.write_row((row[0], row[7]))
+            cur.execute(
+                "UPDATE books SET available_copies = a.available_copies "
+                "FROM bench_available a WHERE books.id = a.id AND books.available_copies <> a.available_copies"
+            )
+            cur.execute("ANALYZE rentals")
+        conn.commit()
+    return round(time.perf_counter() - started, 3)
+
+
+async def _asgi_request(app, method: str, path: str, query: str = "", body: Optional[dict] = None):
+    """
+    Drive one request straight through the ASGI app (no sockets, no HTTP client dependency).
+    Returns (status_code, response_body).
+    """
+    payload = json.dumps(body).encode() if body is not None else b""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [
+            (b"host", b"benchmark"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(payload)).encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("benchmark", 80),
+    }
+    done = asyncio.Event()
+    sent = False
+    status_code = 0
+    chunks = []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                done.set()
+
+    await app(scope, receive, send)
+    done.set()
+    return status_code, b"".join(chunks)
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    # nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class _Workload:
+    """
+    Mixed browse / search / rent / return traffic over a seeded dataset.
+    Rentals created by `rent` feed the pool that `return` draws from.
+    """
+
+    ROUTES = {
+        "browse": "GET /books/{book_id}",
+        "search": "GET /books?q=",
+        "rent": "POST /rent",
+        "return": "POST /return",
+    }
+
+    def __init__(self, app, dataset: dict, mix: dict, seed: int, skew: float):
+        self.app = app
+        self.rng = random.Random(seed + 1)
+        self.book_ids = [str(row[0]) for row in dataset["books"]]
+        self.user_ids = [str(row[0]) for row in dataset["users"]]
+        self.book_weights = _zipf_cum_weights(len(self.book_ids), skew)
+        self.open_rentals: list[str] = []
+        self.ops = list(mix.keys())
+        self.op_weights = list(mix.values())
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    def _book(self) -> str:
+        return self.rng.choices(self.book_ids, cum_weights=self.book_weights, k=1)[0]
+
+    async def _one(self, record: bool = True):
+        op = self.rng.choices(self.ops, weights=self.op_weights, k=1)[0]
+        if op == "return" and not self.open_rentals:
+            op = "rent"
+
+        if op == "browse":
+            call = ("GET", f"/books/{self._book()}", "", None)
+        elif op == "search":
+            call = ("GET", "/books", f"q={self.rng.choice(TITLE_WORDS)}", None)
+        elif op == "rent":
+            call = ("POST", "/rent", "", {"user_id": self.rng.choice(self.user_ids), "book_id": self._book(), "days": 14})
+        else:
+            rental_id = self.open_rentals.pop(self.rng.randrange(len(self.open_rentals)))
+            call = ("POST", "/return", "", {"rental_id": rental_id})
+
+        started = time.perf_counter()
+        status_code, body = await _asgi_request(self.app, *call)
+        elapsed = time.perf_counter() - started
+
+        if op == "rent" and status_code == 201:
+            self.open_rentals.append(json.loads(body)["id"])
+        if record:
+            self.latencies[op].append(elapsed)
+            self.statuses[op][status_code] += 1
+
+    async def run(self, requests: int, concurrency: int, record: bool = True) -> float:
+        remaining = requests
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                await self._one(record)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        return time.perf_counter() - started
+
+    def report(self, wall_seconds: float) -> dict:
+        routes = {}
+        for op in self.ops:
+            samples = sorted(self.latencies.get(op, []))
+            statuses = dict(self.statuses.get(op, {}))
+            routes[op] = {
+                "route": self.ROUTES[op],
+                "requests": len(samples),
+                "errors": sum(n for code, n in statuses.items() if code >= 500 or code == 0),
+                "status_codes": {str(code): n for code, n in sorted(statuses.items())},
+                "throughput_rps": round(len(samples) / wall_seconds, 2) if wall_seconds else 0.0,
+                "latency_ms": {
+                    "mean": round(sum(samples) / len(samples) * 1000, 3) if samples else 0.0,
+                    "p50": round(_percentile(samples, 50) * 1000, 3),
+                    "p95": round(_percentile(samples, 95) * 1000, 3),
+                    "p99": round(_percentile(samples, 99) * 1000, 3),
+                    "max": round(samples[-1] * 1000, 3) if samples else 0.0,
+                },
+            }
+        total = sum(r["requests"] for r in routes.values())
+        return {
+            "wall_seconds": round(wall_seconds, 3),
+            "total_requests": total,
+            "throughput_rps": round(total / wall_seconds, 2) if wall_seconds else 0.0,
+            "routes": routes,
+        }
+
+
+async def _drive(dataset: dict, mix: dict, requests: int, warmup: int, concurrency: int, seed: int, skew: float) -> dict:
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        workload = _Workload(app, dataset, mix, seed, skew)
+        if warmup:
+            await workload.run(warmup, concurrency, record=False)
+        wall = await workload.run(requests, concurrency)
+        return workload.report(wall)
+
+
+def parse_mix(spec: Optional[str]) -> dict:
+    """
+    Parse a mix such as "browse=60,search=20,rent=12,return=8".
+    Unknown operations are rejected; omitted ones get weight 0.
+    """
+    if not spec:
+        return dict(DEFAULT_MIX)
+    mix = {op: 0 for op in DEFAULT_MIX}
+    for part in spec.split(","):
+        op, _, weight = part.partition("=")
+        op = op.strip()
+        if op not in mix:
+            raise ValueError(f"Unknown operation in mix: {op!r} (expected one of {', '.join(DEFAULT_MIX)})")
+        mix[op] = int(weight)
+    if not any(mix.values()):
+        raise ValueError("Mix must have at least one operation with a positive weight")
+    return mix
+
+
+def run_benchmark(
+    books: int = 10_000,
+    users: int = 2_000,
+    rentals: int = 50_000,
+    requests: int = 5_000,
+    warmup: int = 200,
+    concurrency: int = 16,
+    mix: Optional[str] = None,
+    seed: int = 42,
+    skew: float = 1.1,
+    reset: bool = False,
+    skip_seed: bool = False,
+) -> dict:
+    """
+    Seed a synthetic dataset, replay a concurrent mixed workload against the ASGI app
+    and return a JSON-serialisable report with per-route throughput and latency percentiles.
+    With the same seed and parameters the dataset and request sequence are identical,
+    so reports from different releases can be compared directly. `skip_seed` keeps the
+    seeded books/users but restores rentals and available_copies, since the rent/return
+    traffic of the previous run has changed them.
+    """
+    started_at = datetime.now(timezone.utc).isoformat()
+    weights = parse_mix(mix)
+    dataset = generate_dataset(books, users, rentals, seed=seed, skew=skew)
+
+    if skip_seed:
+        seed_seconds = {"restore_rentals": restore_rentals(dataset)}
+    else:
+        seed_seconds = seed_database(dataset, reset=reset)
+
+    results = asyncio.run(_drive(dataset, weights, requests, warmup, concurrency, seed, skew))
+    return {
+        "started_at": started_at,
+        "params": {
+            "books": books, "users": users, "rentals": rentals, "requests": requests,
+            "warmup": warmup, "concurrency": concurrency, "mix": weights, "seed": seed, "skew": skew,
+        },
+        "seed_seconds": seed_seconds,
+        **results,
+    }
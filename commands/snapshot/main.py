@@ -0,0 +1,252 @@
+import io
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import psycopg
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from sqlalchemy import Date, DateTime, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+
+from src.models import Books, Users, Rental  # noqa: F401  (register tables on Base)
+from src.utils.db_utils import Base, get_psycopg_conninfo
+
+# load order respects foreign keys (rentals -> books, users)
+TABLES = ("books", "users", "rentals")
+MANIFEST = "manifest.json"
+# size of each COPY chunk parsed into one Parquet row group
+BLOCK_BYTES = 64 * 1024 * 1024
+
+_HEX = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+_NIBBLE = np.zeros(256, dtype=np.uint8)
+_NIBBLE[np.frombuffer(b"0123456789abcdef", dtype=np.uint8)] = np.arange(16, dtype=np.uint8)
+_NIBBLE[np.frombuffer(b"ABCDEF", dtype=np.uint8)] = np.arange(10, 16, dtype=np.uint8)
+
+UUID_TYPE = pa.binary(16)
+TIMESTAMP_TYPE = pa.timestamp("us", tz="UTC")
+
+
+def _columns(table: str) -> list:
+    return list(Base.metadata.tables[table].columns)
+
+
+def _arrow_type(column) -> pa.DataType:
+    t = column.type
+    if isinstance(t, UUID):
+        return UUID_TYPE
+    if isinstance(t, DateTime):
+        return TIMESTAMP_TYPE
+    if isinstance(t, Date):
+        return pa.date32()
+    if isinstance(t, Integer):
+        return pa.int32()
+    if isinstance(t, String):
+        return pa.string()
+    raise TypeError(f"No Arrow mapping for {column.table.name}.{column.name} ({t!r})")
+
+
+def arrow_schema(table: str) -> pa.Schema:
+    return pa.schema([pa.field(c.name, _arrow_type(c), nullable=c.nullable) for c in _columns(table)])
+
+
+def _export_expr(column) -> str:
+    # render every column as something pyarrow's CSV reader parses without Python per-row work
+    arrow_type = _arrow_type(column)
+    name = f'"{column.name}"'
+    if arrow_type == UUID_TYPE:
+        return f"replace({name}::text, '-', '')"
+    if arrow_type == TIMESTAMP_TYPE:
+        return f"(extract(epoch FROM {name}) * 1000000)::bigint"
+    if arrow_type == pa.date32():
+        return f"({name} - DATE '1970-01-01')"
+    return name
+
+
+def _csv_type(arrow_type: pa.DataType) -> pa.DataType:
+    if arrow_type == UUID_TYPE:
+        return pa.string()
+    if arrow_type == TIMESTAMP_TYPE:
+        return pa.int64()
+    if arrow_type == pa.date32():
+        return pa.int32()
+    return arrow_type
+
+
+def _hex_to_uuid(column: pa.Array) -> pa.Array:
+    # 32-char hex strings -> 16-byte fixed-size binary, vectorised
+    n = len(column)
+    offsets = np.frombuffer(column.buffers()[1], dtype=np.int32)[column.offset:column.offset + n + 1]
+    if column.null_count or not np.all(np.diff(offsets) == 32):
+        raise ValueError("UUID columns must hold exactly one 32-digit hex value per row")
+    chars = np.frombuffer(column.buffers()[2], dtype=np.uint8)[offsets[0]:offsets[0] + n * 32]
+    nibbles = _NIBBLE[chars.reshape(n, 16, 2)]
+    raw = (nibbles[:, :, 0] << 4) | nibbles[:, :, 1]
+    return pa.FixedSizeBinaryArray.from_buffers(UUID_TYPE, n, [None, pa.py_buffer(raw.tobytes())])
+
+
+def _uuid_to_hex(column: pa.Array) -> pa.Array:
+    if column.null_count:
+        raise ValueError("UUID columns must not contain NULLs")
+    n = len(column)
+    raw = np.frombuffer(column.buffers()[1], dtype=np.uint8)[column.offset * 16:(column.offset + n) * 16]
+    raw = raw.reshape(n, 16)
+    chars = np.empty((n, 16, 2), dtype=np.uint8)
+    chars[:, :, 0] = _HEX[raw >> 4]
+    chars[:, :, 1] = _HEX[raw & 0x0F]
+    offsets = np.arange(0, (n + 1) * 32, 32, dtype=np.int32)
+    return pa.StringArray.from_buffers(n, pa.py_buffer(offsets.tobytes()), pa.py_buffer(chars.tobytes()))
+
+
+def _parse_block(block: bytes, schema: pa.Schema) -> pa.Table:
+    raw = pa_csv.read_csv(
+        io.BytesIO(block),
+        read_options=pa_csv.ReadOptions(column_names=schema.names, block_size=BLOCK_BYTES + 1024 * 1024),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={f.name: _csv_type(f.type) for f in schema},
+            # only an unquoted empty field is NULL; pyarrow's default null markers
+            # (NULL, N/A, nan, ...) are ordinary values that Postgres does not quote
+            null_values=[""],
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,  # "" is an empty string
+        ),
+    )
+    arrays = []
+    for field in schema:
+        column = raw.column(field.name).combine_chunks()
+        if field.type == UUID_TYPE:
+            column = _hex_to_uuid(column)
+        elif field.type != column.type:
+            column = column.cast(field.type)
+        arrays.append(column)
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _split_block(buffer: bytearray) -> int:
+    """
+    End of the last complete CSV record in `buffer` (0 if none). A newline ends a record
+    only outside quotes, i.e. when the number of quote characters before it is even.
+    """
+    pos = buffer.rfind(b"\n")
+    while pos != -1:
+        if buffer.count(b'"', 0, pos) % 2 == 0:
+            return pos + 1
+        pos = buffer.rfind(b"\n", 0, pos)
+    return 0
+
+
+def _export_table(cur, table: str, path: Path, compression: str) -> int:
+    schema = arrow_schema(table)
+    select = ", ".join(_export_expr(c) for c in _columns(table))
+    rows = 0
+    with pq.ParquetWriter(path, schema, compression=compression) as writer:
+        buffer = bytearray()
+
+        def flush(upto: int):
+            nonlocal rows
+            parsed = _parse_block(bytes(buffer[:upto]), schema)
+            del buffer[:upto]
+            writer.write_table(parsed, row_group_size=max(1, parsed.num_rows))
+            rows += parsed.num_rows
+
+        with cur.copy(f"COPY (SELECT {select} FROM {table}) TO STDOUT WITH (FORMAT csv)") as copy:
+            for chunk in copy:
+                buffer += chunk
+                if len(buffer) >= BLOCK_BYTES:
+                    end = _split_block(buffer)
+                    if end:
+                        flush(end)
+        if buffer:
+            flush(len(buffer))
+    return rows
+
+
+def export_snapshot(directory: str, compression: str = "zstd") -> dict:
+    """
+    Write books, users and rentals to typed Parquet files (one per table) plus a manifest.
+    Rows are streamed out of Postgres with COPY and parsed by pyarrow in ~64 MB blocks,
+    each block becoming one row group, so memory stays flat regardless of table size.
+    All tables are read in one REPEATABLE READ transaction, so the files are consistent.
+    """
+    out = Path(directory)
+    out.mkdir(parents=True, exist_ok=True)
+    manifest = {"created_at": datetime.now(timezone.utc).isoformat(), "compression": compression, "tables": {}}
+
+    with psycopg.connect(get_psycopg_conninfo()) as conn:
+        conn.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        with conn.cursor() as cur:
+            for table in TABLES:
+                started = time.perf_counter()
+                path = out / f"{table}.parquet"
+                rows = _export_table(cur, table, path, compression)
+                manifest["tables"][table] = {
+                    "file": path.name,
+                    "rows": rows,
+                    "bytes": path.stat().st_size,
+                    "seconds": round(time.perf_counter() - started, 3),
+                }
+
+    (out / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return manifest
+
+
+def _to_csv(batch: pa.RecordBatch) -> bytes:
+    arrays = [
+        _uuid_to_hex(batch.column(i)) if batch.schema.field(i).type == UUID_TYPE else batch.column(i)
+        for i in range(batch.num_columns)
+    ]
+    sink = io.BytesIO()
+    pa_csv.write_csv(
+        pa.Table.from_arrays(arrays, names=batch.schema.names),
+        sink,
+        # quote every value so empty strings stay distinct from NULL (written unquoted)
+        pa_csv.WriteOptions(include_header=False, quoting_style="all_valid"),
+    )
+    return sink.getvalue()
+
+
+def import_snapshot(directory: str, truncate: bool = False, batch_rows: int = 250_000) -> dict:
+    """
+    Bulk-load a snapshot written by export_snapshot through COPY ... FROM STDIN (csv).
+    Parquet files are memory-mapped and read batch by batch; the whole restore is one
+    transaction. Refuses a non-empty library unless `truncate` is set.
+    """
+    src = Path(directory)
+    manifest = json.loads((src / MANIFEST).read_text(encoding="utf-8"))
+    result = {}
+
+    with psycopg.connect(get_psycopg_conninfo()) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL TIME ZONE 'UTC'")
+            if truncate:
+                cur.execute("TRUNCATE rentals, users, books")
+            else:
+                cur.execute("SELECT EXISTS (SELECT 1 FROM books) OR EXISTS (SELECT 1 FROM users)")
+                if cur.fetchone()[0]:
+                    raise SystemExit("Database is not empty; re-run with --truncate to replace its contents.")
+
+            for table in TABLES:
+                started = time.perf_counter()
+                parquet = pq.ParquetFile(src / manifest["tables"][table]["file"], memory_map=True)
+                expected = arrow_schema(table)
+                # tolerate column order differences, but not missing columns
+                names = [name for name in expected.names if name in parquet.schema_arrow.names]
+                missing = set(expected.names) - set(names)
+                if missing:
+                    raise SystemExit(f"{table}: snapshot is missing columns {sorted(missing)}")
+
+                rows = 0
+                column_list = ", ".join(f'"{n}"' for n in names)
+                with cur.copy(f"COPY {table} ({column_list}) FROM STDIN WITH (FORMAT csv)") as copy:
+                    for batch in parquet.iter_batches(batch_size=batch_rows, columns=names):
+                        copy.write(_to_csv(batch))
+                        rows += batch.num_rows
+                result[table] = {"rows": rows, "seconds": round(time.perf_counter() - started, 3)}
+
+            cur.execute("ANALYZE books, users, rentals")
+        conn.commit()
+
+    return result
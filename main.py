@@ -3,23 +3,60 @@ if sys.platform.startswith("win"):
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
+from settings import ADMISSION_ENABLED, QUERY_COUNT_HEADERS, QUERY_COUNT_WARN_REPEATS
 from src.utils.db_utils import engine, Base
+from src.utils.query_counter import QueryCountMiddleware, install_query_counter
+from src.utils.availability_feed import availability_feed
+from src.utils.admission import AdmissionMiddleware, admission
+from src.utils.recommendations import recommendations
+from src.utils.circulation_analytics import analytics
+from src.utils.idempotency import IdempotencyMiddleware, idempotency_store
+from src.utils.import_jobs import import_jobs
+from src.api.book_changes import router as book_changes_router
 from src.api.books import router as books_router
 from src.api.users import router as users_router
 from src.api.rentals import router as rentals_router
 from src.api.debug import router as debug_router
+from src.api.recommendations import router as recommendations_router
+from src.api.reports import router as reports_router
+from src.api.imports import router as imports_router
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    await availability_feed.start()
+    await recommendations.start()
+    await analytics.start()
+    await idempotency_store.start()
+    await import_jobs.start()
     yield
+    await import_jobs.stop()
+    await idempotency_store.stop()
+    await analytics.stop()
+    await recommendations.stop()
+    await availability_feed.stop()
 
 app = FastAPI(title="Library Management API", version="1.0.0", lifespan=lifespan)
 
+install_query_counter(engine)
+app.add_middleware(
+    QueryCountMiddleware,
+    expose_headers=QUERY_COUNT_HEADERS,
+    warn_repeats=QUERY_COUNT_WARN_REPEATS,
+)
+app.add_middleware(IdempotencyMiddleware, store=idempotency_store)
+if ADMISSION_ENABLED:
+    # added last so it runs first: shed requests never reach the pool
+    app.add_middleware(AdmissionMiddleware, controller=admission)
+
+app.include_router(book_changes_router)  # must precede books_router
 app.include_router(books_router)
+app.include_router(recommendations_router)
 app.include_router(users_router)
 app.include_router(rentals_router)
+app.include_router(reports_router)
+app.include_router(imports_router)
 app.include_router(debug_router)
 
 @app.get("/", tags=["Health"])
@@ -0,0 +1,78 @@
+# ── run:  python -m scripts.bench_analytics [rentals] [books]
+# Times the circulation reports on a synthetic in-memory snapshot (no database needed).
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+# Ensure project root in sys.path when running as a script
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.utils.circulation_analytics import CirculationSnapshot
+
+
+def synthetic_snapshot(rentals: int, books: int, publishers: int = 5_000, seed: int = 42) -> CirculationSnapshot:
+    rng = np.random.default_rng(seed)
+    now = datetime.now(timezone.utc)
+    as_of = now.timestamp() / 86400.0
+
+    book_publisher = rng.integers(0, publishers, books, dtype=np.int32)
+    book_year = rng.integers(1950, 2026, books, dtype=np.int32)
+    book_copies = rng.integers(1, 6, books, dtype=np.int32)
+
+    # Zipf-skewed popularity: a few books get most of the loans
+    book = (rng.zipf(1.3, rentals) - 1) % books
+    rented = as_of - rng.uniform(0, 3 * 365, rentals)
+    due = np.floor(rented + rng.choice([7, 14, 21, 30], rentals)).astype(np.int32)
+    returned = rented + rng.gamma(2.0, 8.0, rentals)
+    returned[(returned > as_of) | (rng.random(rentals) < 0.02)] = np.nan
+
+    return CirculationSnapshot(
+        taken_at=now,
+        as_of=as_of,
+        publishers=[f"Publisher {i}" for i in range(publishers)],
+        book_publisher=book_publisher,
+        book_published_year=book_year,
+        book_copies=book_copies,
+        rental_publisher=book_publisher[book],
+        rental_published_year=book_year[book],
+        rented=rented,
+        due=due,
+        returned=returned,
+        quantity=np.ones(rentals, dtype=np.int32),
+    )
+
+
+def _time(label: str, fn, repeat: int = 3) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<42} {best * 1000:>10.1f} ms")
+
+
+def main(rentals: int, books: int):
+    started = time.perf_counter()
+    snap = synthetic_snapshot(rentals, books)
+    print(f">>> Synthetic snapshot: {rentals:,} rentals, {books:,} books in {time.perf_counter() - started:.1f}s")
+
+    end = int(np.floor(snap.as_of))
+    year_start = end - 364
+    _time("utilization day, 1y", lambda: snap.utilization(year_start, end))
+    _time("utilization week, 3y", lambda: snap.utilization(end - 3 * 365, end, granularity="week"))
+    _time("utilization week, 1y, by publisher", lambda: snap.utilization(year_start, end, "week", "publisher"))
+    _time("utilization day, 1y, by published_year", lambda: snap.utilization(year_start, end, "day", "published_year"))
+    _time("loan durations, 3y", lambda: snap.loan_durations(end - 3 * 365, end))
+    _time("loan durations, 1y, by publisher", lambda: snap.loan_durations(year_start, end, "publisher"))
+    _time("overdue, 3y, by rental year", lambda: snap.overdue(end - 3 * 365, end, "year"))
+    _time("overdue, 1y, by publisher", lambda: snap.overdue(year_start, end, "publisher"))
+
+
+if __name__ == "__main__":
+    n_rentals = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    n_books = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    main(n_rentals, n_books)
@@ -0,0 +1,125 @@
+# ── run:  python -m scripts.bench_statements [--postgres] [iterations]
+# Per-route cost of rebuilding select() constructs vs the prebuilt statements in
+# src/utils/statements.py.
+#  * default: in-memory SQLite, isolates SQLAlchemy CPU (build + cache key + execute)
+#  * --postgres: the configured database, timing all four combinations of rebuilt /
+#    prebuilt statements and psycopg prepared statements off (prepare_threshold=None) /
+#    on (prepare_threshold=0), so each change's saving can be attributed on its own
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# Ensure project root in sys.path when running as a script
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.models import Books, Users, Rental
+from src.utils.db_utils import Base, get_database_url
+from src.utils import statements as S
+
+USER_ID, BOOK_ID = uuid.uuid4(), uuid.uuid4()
+
+# (route, rebuilt-per-request statement as the routes used to do it, prebuilt statement, params)
+CASES = [
+    (
+        "GET /books/by-isbn/{isbn}",
+        lambda: (select(Books).where(Books.isbn == "0000000000"), {}),
+        lambda: (S.BOOK_BY_ISBN, {"isbn": "0000000000"}),
+    ),
+    (
+        "GET /rentals?active=true&user_id=",
+        lambda: (
+            select(Rental).where(Rental.returned_at.is_(None)).where(Rental.user_id == USER_ID)
+            .order_by(Rental.rented_at.desc()),
+            {},
+        ),
+        lambda: (S.list_rentals_stmt(True, True, False), {"user_id": USER_ID}),
+    ),
+    (
+        "POST /return (active rental lookup)",
+        lambda: (
+            select(Rental).where(Rental.user_id == USER_ID, Rental.book_id == BOOK_ID, Rental.returned_at.is_(None))
+            .order_by(Rental.rented_at.desc()).limit(1),
+            {},
+        ),
+        lambda: (S.ACTIVE_RENTAL_FOR, {"user_id": USER_ID, "book_id": BOOK_ID}),
+    ),
+    (
+        "POST /users (email check)",
+        lambda: (select(Users).where(Users.email == "a@example.com"), {}),
+        lambda: (S.EMAIL_TAKEN, {"email": "a@example.com"}),
+    ),
+    (
+        "PATCH /users/{id} (email check)",
+        lambda: (select(Users).where(Users.email == "a@example.com", Users.id != USER_ID), {}),
+        lambda: (S.EMAIL_TAKEN_BY_OTHER, {"email": "a@example.com", "user_id": USER_ID}),
+    ),
+]
+
+
+def _report(route: str, before: float, after: float, label_before: str, label_after: str) -> None:
+    saved = before - after
+    print(f"{route:<38} {label_before} {before:8.1f} us   {label_after} {after:8.1f} us   "
+          f"saved {saved:7.1f} us ({saved / before * 100:4.0f}%)")
+
+
+def bench_sqlite(iterations: int) -> None:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Books.__table__, Users.__table__, Rental.__table__])
+    print(f">>> SQLAlchemy CPU per request (in-memory SQLite, {iterations} iterations)")
+    with engine.connect() as conn:
+        for route, rebuilt, prebuilt in CASES:
+            timings = []
+            for make in (rebuilt, prebuilt):
+                for _ in range(200):  # warm compiled cache
+                    conn.execute(*make()).all()
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    conn.execute(*make()).all()
+                timings.append((time.perf_counter() - started) / iterations * 1e6)
+            _report(route, timings[0], timings[1], "rebuilt", "prebuilt")
+
+
+async def _pg_latency(prepare_threshold, make, iterations: int) -> float:
+    engine = create_async_engine(get_database_url(), connect_args={"prepare_threshold": prepare_threshold})
+    try:
+        async with engine.connect() as conn:
+            for _ in range(50):
+                (await conn.execute(*make())).all()
+            started = time.perf_counter()
+            for _ in range(iterations):
+                (await conn.execute(*make())).all()
+            return (time.perf_counter() - started) / iterations * 1e6
+    finally:
+        await engine.dispose()
+
+
+async def bench_postgres(iterations: int) -> None:
+    print(f">>> Round-trip latency per request in us (Postgres, {iterations} iterations)")
+    print(f"{'':<38} {'rebuilt':>10} {'rebuilt':>10} {'prebuilt':>10} {'prebuilt':>10}   {'saved by':>19}")
+    print(f"{'':<38} {'unprep.':>10} {'prepared':>10} {'unprep.':>10} {'prepared':>10}"
+          f"   {'prebuild':>9} {'prepare':>9}")
+    for route, rebuilt, prebuilt in CASES:
+        t = {
+            (make_name, threshold): await _pg_latency(threshold, make, iterations)
+            for make_name, make in (("rebuilt", rebuilt), ("prebuilt", prebuilt))
+            for threshold in (None, 0)
+        }
+        # saving from each change alone, holding the other one off
+        prebuild = t[("rebuilt", None)] - t[("prebuilt", None)]
+        prepare = t[("prebuilt", None)] - t[("prebuilt", 0)]
+        print(f"{route:<38} {t[('rebuilt', None)]:10.1f} {t[('rebuilt', 0)]:10.1f} "
+              f"{t[('prebuilt', None)]:10.1f} {t[('prebuilt', 0)]:10.1f}   {prebuild:9.1f} {prepare:9.1f}")
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    n = int(args[0]) if args else 5000
+    bench_sqlite(n)
+    if "--postgres" in sys.argv:
+        asyncio.run(bench_postgres(max(1, n // 5)))
@@ -14,10 +14,76 @@ def get_config(key: str, default: Optional[str] = None) -> Optional[str]:
     return os.getenv(key, default)
 
 
+def get_bool_config(key: str, default: bool = False) -> bool:
+    """
+    Get a boolean flag from environment variables ("1", "true", "yes", "on").
+    """
+    value = os.getenv(key)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 ### DEFAULT SETTINGS
 
 POSTGRES_PASSWORD = get_config(key="POSTGRES_PASSWORD", default="password")
 POSTGRES_USER = get_config(key="POSTGRES_USER", default="user")
 POSTGRES_DB = get_config(key="POSTGRES_DB", default="database")
 
+# psycopg server-side prepared statements: a statement is prepared after it has run this many
+# times on a connection (unset: psycopg's default of 5). Set "none" to turn them off, which
+# PgBouncer in transaction mode (before 1.21's max_prepared_statements) requires
+PG_PREPARE_THRESHOLD = get_config(key="PG_PREPARE_THRESHOLD", default=None)
+PG_PREPARED_MAX = int(get_config(key="PG_PREPARED_MAX", default="256"))
+
+# API connection pool (SQLAlchemy defaults); admission control derives its cap from these
+DB_POOL_SIZE = int(get_config(key="DB_POOL_SIZE", default="5"))
+DB_MAX_OVERFLOW = int(get_config(key="DB_MAX_OVERFLOW", default="10"))
+
+# per-request SQL statement counting (see src/utils/query_counter.py)
+QUERY_COUNT_HEADERS = get_bool_config(key="QUERY_COUNT_HEADERS", default=False)
+QUERY_COUNT_WARN_REPEATS = int(get_config(key="QUERY_COUNT_WARN_REPEATS", default="0"))
+
+# GET /books/changes (see src/utils/availability_feed.py)
+AVAILABILITY_FEED_BACKLOG = int(get_config(key="AVAILABILITY_FEED_BACKLOG", default="1000"))
+AVAILABILITY_FEED_QUEUE_SIZE = int(get_config(key="AVAILABILITY_FEED_QUEUE_SIZE", default="1000"))
+AVAILABILITY_FEED_KEEPALIVE_SECONDS = float(get_config(key="AVAILABILITY_FEED_KEEPALIVE_SECONDS", default="15"))
+
+# admission control / load shedding (see src/utils/admission.py)
+# unless ADMISSION_MAX_IN_FLIGHT is set, the in-flight cap is the pool's pool_size + max_overflow
+# minus the connections held by background services (recommendations, imports, idempotency)
+ADMISSION_ENABLED = get_bool_config(key="ADMISSION_ENABLED", default=True)
+ADMISSION_MAX_IN_FLIGHT = get_config(key="ADMISSION_MAX_IN_FLIGHT", default=None)
+ADMISSION_RESERVED_FOR_WRITES = int(get_config(key="ADMISSION_RESERVED_FOR_WRITES", default="3"))
+ADMISSION_MAX_WAIT_SECONDS = float(get_config(key="ADMISSION_MAX_WAIT_SECONDS", default="2"))
+ADMISSION_POOL_WAIT_BUDGET_MS = float(get_config(key="ADMISSION_POOL_WAIT_BUDGET_MS", default="250"))
+
+# GET /books/{book_id}/related (see src/utils/recommendations.py)
+RECOMMENDATIONS_TOP_K = int(get_config(key="RECOMMENDATIONS_TOP_K", default="50"))
+RECOMMENDATIONS_REFRESH_SECONDS = float(get_config(key="RECOMMENDATIONS_REFRESH_SECONDS", default="60"))
+RECOMMENDATIONS_FULL_REBUILD_SECONDS = float(get_config(key="RECOMMENDATIONS_FULL_REBUILD_SECONDS", default="3600"))
+
+# GET /reports/... (see src/utils/circulation_analytics.py)
+# the snapshot is reloaded in the background every ANALYTICS_SNAPSHOT_TTL_SECONDS over one
+# dedicated connection; point ANALYTICS_DATABASE_URL at a read replica to keep that scan off
+# the primary (default)
+ANALYTICS_DATABASE_URL = get_config(key="ANALYTICS_DATABASE_URL", default=None)
+ANALYTICS_SNAPSHOT_TTL_SECONDS = float(get_config(key="ANALYTICS_SNAPSHOT_TTL_SECONDS", default="900"))
+
+# Idempotency-Key support for POST /rent, /return, /books, /users (see src/utils/idempotency.py)
+IDEMPOTENCY_TTL_SECONDS = float(get_config(key="IDEMPOTENCY_TTL_SECONDS", default="86400"))
+# a claim with no stored response can be taken over after this long (request crashed / worker died)
+IDEMPOTENCY_LEASE_SECONDS = float(get_config(key="IDEMPOTENCY_LEASE_SECONDS", default="60"))
+IDEMPOTENCY_LRU_SIZE = int(get_config(key="IDEMPOTENCY_LRU_SIZE", default="10000"))
+IDEMPOTENCY_CLEANUP_SECONDS = float(get_config(key="IDEMPOTENCY_CLEANUP_SECONDS", default="300"))
+
+# POST /imports background CSV jobs (see src/utils/import_jobs.py)
+# each worker holds one pooled connection while it writes a batch
+IMPORT_WORKERS = int(get_config(key="IMPORT_WORKERS", default="2"))
+IMPORT_MAX_QUEUED = int(get_config(key="IMPORT_MAX_QUEUED", default="8"))
+IMPORT_BATCH_ROWS = int(get_config(key="IMPORT_BATCH_ROWS", default="500"))
+IMPORT_MAX_UPLOAD_BYTES = int(get_config(key="IMPORT_MAX_UPLOAD_BYTES", default=str(512 * 1024 * 1024)))
+IMPORT_SPOOL_DIR = get_config(key="IMPORT_SPOOL_DIR", default=None)  # default: <tmp>/library-imports
+IMPORT_JOB_HISTORY = int(get_config(key="IMPORT_JOB_HISTORY", default="200"))
+
 ###
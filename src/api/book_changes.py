@@ -0,0 +1,59 @@
+import asyncio
+import json
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+
+from settings import AVAILABILITY_FEED_KEEPALIVE_SECONDS
+from src.utils.availability_feed import availability_feed
+
+# included before the books router so "/books/changes" isn't captured by "/books/{book_id}"
+router = APIRouter(prefix="/books", tags=["Books"])
+
+
+def _format_event(event: dict) -> str:
+    if event["type"] == "reset":
+        return "event: reset\ndata: {}\n\n"
+    return f"id: {event['seq']}\nevent: availability\ndata: {json.dumps(event)}\n\n"
+
+
+@router.get("/changes")
+async def book_changes(
+    request: Request,
+    book_id: Optional[List[UUID]] = Query(None, description="Only stream changes for these books"),
+    since: Optional[int] = Query(None, description="Replay events delivered after the event with this id"),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Server-Sent Events stream of `available_copies` changes.
+    Browsers reconnect with `Last-Event-ID` automatically; other clients can pass `since`.
+    A `reset` event means the client missed changes and should re-fetch its books.
+    """
+    last_seq = since
+    if last_seq is None and last_event_id and last_event_id.isdigit():
+        last_seq = int(last_event_id)
+    book_ids = {str(b) for b in book_id} if book_id else None
+    sub = availability_feed.subscribe(book_ids=book_ids, last_seq=last_seq)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), timeout=AVAILABILITY_FEED_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _format_event(event)
+                if sub.overflowed:
+                    break
+        finally:
+            availability_feed.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
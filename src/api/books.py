@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, or_
 from typing import List, Optional
@@ -7,6 +7,9 @@ from uuid import UUID
 from src.api.deps import get_db
 from src.models.Books import Books as BookModel
 from src.schemas.book_schema import BookCreate, BookUpdate, Book as BookOut
+from src.utils.availability_feed import publish_availability
+from src.utils.idempotency import record_response
+from src.utils.statements import BOOK_BY_ISBN, ISBN_TAKEN
 
 router = APIRouter(prefix="/books", tags=["Books"])
 
@@ -37,11 +40,11 @@ async def get_book(book_id: UUID, db: AsyncSession = Depends(get_db)):
     return book
 
 @router.post("", response_model=BookOut, status_code=status.HTTP_201_CREATED)
-async def create_book(payload: BookCreate, db: AsyncSession = Depends(get_db)):
+async def create_book(payload: BookCreate, request: Request, db: AsyncSession = Depends(get_db)):
     # unique ISBN if provided
     if payload.isbn:
-        res = await db.execute(select(BookModel).where(BookModel.isbn == payload.isbn))
-        if res.scalars().first():
+        res = await db.execute(ISBN_TAKEN, {"isbn": payload.isbn})
+        if res.first():
             raise HTTPException(status_code=409, detail="ISBN already exists")
 
     book = BookModel(
@@ -57,8 +60,10 @@ async def create_book(payload: BookCreate, db: AsyncSession = Depends(get_db)):
         available_copies=payload.total_copies,
     )
     db.add(book)
-    await db.commit()
+    await db.flush()
     await db.refresh(book)
+    await record_response(db, request, BookOut.model_validate(book), status.HTTP_201_CREATED)
+    await db.commit()
     return book
 
 @router.patch("/{book_id}", response_model=BookOut)
@@ -68,8 +73,8 @@ async def update_book(book_id: UUID, payload: BookUpdate, db: AsyncSession = Dep
         raise HTTPException(status_code=404, detail="Book not found")
 
     if payload.isbn is not None and payload.isbn != book.isbn:
-        res = await db.execute(select(BookModel).where(BookModel.isbn == payload.isbn))
-        if res.scalars().first():
+        res = await db.execute(ISBN_TAKEN, {"isbn": payload.isbn})
+        if res.first():
             raise HTTPException(status_code=409, detail="ISBN already exists")
 
     if payload.title is not None: book.title = payload.title
@@ -86,6 +91,8 @@ async def update_book(book_id: UUID, payload: BookUpdate, db: AsyncSession = Dep
         book.available_copies = max(0, (book.available_copies or 0) + diff)
 
     db.add(book)
+    if payload.total_copies is not None:
+        await publish_availability(db, book)
     await db.commit()
     await db.refresh(book)
     return book
@@ -112,7 +119,7 @@ async def delete_book(book_id: UUID, db: AsyncSession = Depends(get_db)):
 # Optional helper to avoid UUID typing for users: get by ISBN
 @router.get("/by-isbn/{isbn}", response_model=BookOut)
 async def get_book_by_isbn(isbn: str, db: AsyncSession = Depends(get_db)):
-    res = await db.execute(select(BookModel).where(BookModel.isbn == isbn))
+    res = await db.execute(BOOK_BY_ISBN, {"isbn": isbn})
     book = res.scalars().first()
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
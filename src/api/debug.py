@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text
-from src.utils.db_utils import engine
+from src.utils.db_utils import engine, pool_capacity
+from src.utils.admission import admission, background_pool_connections
 from src.api.deps import get_db
 from src.models.Books import Books
 
@@ -14,3 +15,13 @@ async def db_info(db: AsyncSession = Depends(get_db)):
     # also check via raw SQL count
     cnt = (await db.execute(text("SELECT COUNT(*) FROM books"))).scalar_one()
     return {"engine_url": str(engine.url), "books_len": len(rows), "books_count": cnt}
+
+@router.get("/admission")
+async def admission_info():
+    # in-flight / queued / shed counters per route class, plus pool checkout latency
+    return {
+        **admission.snapshot(),
+        "pool": engine.pool.status(),
+        "pool_capacity": pool_capacity(),
+        "background_pool_connections": background_pool_connections(),
+    }
@@ -1,8 +1,14 @@
 # src/api/deps.py
+import time
 from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession
+from src.utils.admission import admission
 from src.utils.db_utils import create_database_session  
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """Request session whose connection is checked out up front, so admission control can measure pool wait."""
     async for session in create_database_session():
+        started = time.perf_counter()
+        await session.connection()
+        admission.record_pool_wait((time.perf_counter() - started) * 1000)
         yield session
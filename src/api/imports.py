@@ -0,0 +1,109 @@
+import asyncio
+import codecs
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+from settings import IMPORT_MAX_UPLOAD_BYTES
+from src.schemas.import_schema import ImportJob as ImportJobOut
+from src.utils.import_jobs import ImportQueueFull, import_jobs
+
+router = APIRouter(prefix="/imports", tags=["Imports"])
+
+# coalesce request chunks before each hop to the file-writing thread
+SPOOL_WRITE_BYTES = 1024 * 1024
+
+
+class _UploadTooLarge(Exception):
+    pass
+
+
+def _encoding(content_type: str, declared: Optional[str]) -> str:
+    # ?encoding= wins over the Content-Type charset; UTF-8 unless either is given
+    if not declared:
+        for param in content_type.split(";")[1:]:
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "charset":
+                declared = value.strip('"')
+    try:
+        return codecs.lookup(declared or "utf-8").name
+    except LookupError:
+        raise HTTPException(status_code=400, detail=f"Unknown encoding: {declared}")
+
+
+async def _spool(request: Request, job) -> None:
+    f = await asyncio.to_thread(job.spool_path.open, "wb")
+    try:
+        pending = bytearray()
+        async for chunk in request.stream():
+            job.bytes_received += len(chunk)
+            if job.bytes_received > IMPORT_MAX_UPLOAD_BYTES:
+                raise _UploadTooLarge()
+            pending += chunk
+            if len(pending) >= SPOOL_WRITE_BYTES:
+                await asyncio.to_thread(f.write, bytes(pending))
+                pending.clear()
+        if pending:
+            await asyncio.to_thread(f.write, bytes(pending))
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+@router.post("", response_model=ImportJobOut, status_code=202)
+async def create_import(
+    request: Request,
+    response: Response,
+    filename: Optional[str] = Query(None),
+    encoding: Optional[str] = Query(None, description="e.g. latin-1 for the Book-Crossing dump; "
+                                                      "defaults to the Content-Type charset, then UTF-8"),
+):
+    """
+    Import books from a CSV sent as the raw request body (`Content-Type: text/csv`),
+    with the same columns and normalization as scripts/import_books_async.py.
+    Rows that are not valid text in the upload's encoding are rejected, not repaired.
+    The body is streamed to a spool file and the import runs in the background;
+    poll the returned `Location` (GET /imports/{id}) for progress.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/"):
+        raise HTTPException(status_code=415, detail="Send the CSV as the raw request body, not as a form upload")
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > IMPORT_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"CSV is larger than {IMPORT_MAX_UPLOAD_BYTES} bytes")
+    encoding = _encoding(content_type, encoding)
+
+    try:
+        job = import_jobs.create(filename, encoding)
+    except ImportQueueFull:
+        raise HTTPException(status_code=503, detail="Too many imports queued, retry later",
+                            headers={"Retry-After": "30"})
+    try:
+        await _spool(request, job)
+    except _UploadTooLarge:
+        import_jobs.discard(job)
+        raise HTTPException(status_code=413, detail=f"CSV is larger than {IMPORT_MAX_UPLOAD_BYTES} bytes")
+    except BaseException:  # ClientDisconnect, cancellation, disk errors
+        import_jobs.discard(job)
+        raise
+    if job.bytes_received == 0:
+        import_jobs.discard(job)
+        raise HTTPException(status_code=400, detail="Empty CSV")
+
+    import_jobs.submit(job)
+    response.headers["Location"] = f"/imports/{job.id}"
+    return job
+
+
+@router.get("", response_model=List[ImportJobOut])
+async def list_imports():
+    """Imports accepted by this server process, newest first."""
+    return import_jobs.recent()
+
+
+@router.get("/{job_id}", response_model=ImportJobOut)
+async def get_import(job_id: UUID):
+    job = import_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return job
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Query
+from typing import List
+from uuid import UUID
+
+from settings import RECOMMENDATIONS_TOP_K
+from src.schemas.book_schema import RelatedBook
+from src.utils.recommendations import recommendations
+
+router = APIRouter(prefix="/books", tags=["Books"])
+
+@router.get("/{book_id}/related", response_model=List[RelatedBook])
+async def related_books(book_id: UUID, k: int = Query(10, ge=1, le=RECOMMENDATIONS_TOP_K)):
+    """
+    "Patrons also borrowed": books most often rented by the same users, strongest first.
+    Served from the in-memory co-rental index (no database round trip); a book with no
+    rental history yet, or one rented after the last refresh, returns an empty list.
+    """
+    return [RelatedBook(book_id=other, score=score) for other, score in recommendations.related(book_id, k)]
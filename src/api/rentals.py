@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import func
 from datetime import date, timedelta
 from typing import List, Optional
 from uuid import UUID
@@ -9,6 +9,9 @@ from src.models.Books import Books
 from src.models.Users import Users
 from src.models.RentalReq import Rental  
 from src.schemas.rental_schema import RentCreate, ReturnCreate, Rental as RentalOut
+from src.utils.availability_feed import publish_availability
+from src.utils.idempotency import record_response
+from src.utils.statements import ACTIVE_RENTAL_FOR, list_rentals_stmt
 
 router = APIRouter(tags=["Rentals"])
 
@@ -19,21 +22,17 @@ async def list_rentals(
     user_id: Optional[UUID] = None,
     book_id: Optional[str] = None,
 ):
-    stmt = select(Rental)
-    if active is True:
-        stmt = stmt.where(Rental.returned_at.is_(None))
-    if active is False:
-        stmt = stmt.where(Rental.returned_at.is_not(None))
+    stmt = list_rentals_stmt(active, bool(user_id), bool(book_id))
+    params = {}
     if user_id:
-        stmt = stmt.where(Rental.user_id == user_id)
+        params["user_id"] = user_id
     if book_id:
-        stmt = stmt.where(Rental.book_id == book_id)
-    stmt = stmt.order_by(Rental.rented_at.desc())
-    result = await db.execute(stmt)
+        params["book_id"] = book_id
+    result = await db.execute(stmt, params)
     return result.scalars().all()
 
 @router.post("/rent", response_model=RentalOut, status_code=status.HTTP_201_CREATED)
-async def rent_book(payload: RentCreate, db: AsyncSession = Depends(get_db)):
+async def rent_book(payload: RentCreate, request: Request, db: AsyncSession = Depends(get_db)):
     book = await db.get(Books, payload.book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
@@ -52,25 +51,22 @@ async def rent_book(payload: RentCreate, db: AsyncSession = Depends(get_db)):
 
     db.add(rental)
     db.add(book)
-    await db.commit()
+    await publish_availability(db, book)
+    await db.flush()
     await db.refresh(rental)
+    await record_response(db, request, RentalOut.model_validate(rental), status.HTTP_201_CREATED)
+    await db.commit()
     return rental
 
 @router.post("/return", response_model=RentalOut)
-async def return_book(payload: ReturnCreate, db: AsyncSession = Depends(get_db)):
+async def return_book(payload: ReturnCreate, request: Request, db: AsyncSession = Depends(get_db)):
     rental = None
     if payload.rental_id is not None:
         rental = await db.get(Rental, payload.rental_id)
     else:
         if not payload.user_id or not payload.book_id:
             raise HTTPException(status_code=400, detail="Provide rental_id or both user_id and book_id")
-        stmt = (select(Rental)
-                .where(Rental.user_id == payload.user_id,
-                       Rental.book_id == payload.book_id,
-                       Rental.returned_at.is_(None))
-                .order_by(Rental.rented_at.desc())
-                .limit(1))
-        result = await db.execute(stmt)
+        result = await db.execute(ACTIVE_RENTAL_FOR, {"user_id": payload.user_id, "book_id": payload.book_id})
         rental = result.scalars().first()
 
     if not rental:
@@ -87,6 +83,9 @@ async def return_book(payload: ReturnCreate, db: AsyncSession = Depends(get_db))
 
     db.add(rental)
     db.add(book)
-    await db.commit()
+    await publish_availability(db, book)
+    await db.flush()
     await db.refresh(rental)
+    await record_response(db, request, RentalOut.model_validate(rental))
+    await db.commit()
     return rental
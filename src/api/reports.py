@@ -0,0 +1,50 @@
+from datetime import date
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from src.utils.circulation_analytics import SnapshotNotReady, analytics
+
+router = APIRouter(prefix="/reports", tags=["Reports"])
+
+Group = Literal["none", "publisher", "year", "published_year"]
+
+async def _report(name: str, start: Optional[date], end: Optional[date], **params) -> dict:
+    try:
+        return await analytics.report(name, start, end, **params)
+    except SnapshotNotReady:
+        raise HTTPException(status_code=503, detail="Circulation snapshot is still loading",
+                            headers={"Retry-After": "30"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/utilization")
+async def utilization_report(
+    start: Optional[date] = Query(None, description="First day (default: 90 days before end)"),
+    end: Optional[date] = Query(None, description="Last day (default: snapshot date)"),
+    granularity: Literal["day", "week"] = "day",
+    group: Literal["none", "publisher", "published_year"] = "none",
+    top: int = Query(20, ge=1, le=500),
+):
+    """Share of copies on loan per day / week, optionally per publisher or published year."""
+    return await _report("utilization", start, end, granularity=granularity, group=group, top=top)
+
+@router.get("/loan-durations")
+async def loan_durations_report(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    group: Group = "none",
+    top: int = Query(20, ge=1, le=500),
+):
+    """Loan length distribution (mean, p50/p90/p99, histogram) for returned loans."""
+    return await _report("loan_durations", start, end, group=group, top=top)
+
+@router.get("/overdue")
+async def overdue_report(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    group: Group = "none",
+    top: int = Query(20, ge=1, le=500),
+):
+    """Overdue rate: returned late or still out past the due date. `year` groups by rental year."""
+    return await _report("overdue", start, end, group=group, top=top)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List
@@ -6,6 +6,8 @@ from uuid import UUID
 from src.api.deps import get_db
 from src.models.Users import Users
 from src.schemas.user_schema import UserCreate, UserUpdate, User
+from src.utils.idempotency import record_response
+from src.utils.statements import EMAIL_TAKEN, EMAIL_TAKEN_BY_OTHER
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -22,15 +24,17 @@ async def get_user(user_id: UUID, db: AsyncSession = Depends(get_db)):
     return user
 
 @router.post("", response_model=User, status_code=status.HTTP_201_CREATED)
-async def create_user(payload: UserCreate, db: AsyncSession = Depends(get_db)):
-    exists = await db.execute(select(Users).where(Users.email == payload.email))
-    if exists.scalars().first():
+async def create_user(payload: UserCreate, request: Request, db: AsyncSession = Depends(get_db)):
+    exists = await db.execute(EMAIL_TAKEN, {"email": payload.email})
+    if exists.first():
         raise HTTPException(status_code=409, detail="Email already exists")
 
     user = Users(name=payload.name, email=payload.email, phone=payload.phone)
     db.add(user)
-    await db.commit()
+    await db.flush()
     await db.refresh(user)
+    await record_response(db, request, User.model_validate(user), status.HTTP_201_CREATED)
+    await db.commit()
     return user
 
 @router.patch("/{user_id}", response_model=User)
@@ -40,8 +44,8 @@ async def update_user(user_id: UUID, payload: UserUpdate, db: AsyncSession = Dep
         raise HTTPException(status_code=404, detail="User not found")
 
     if payload.email is not None and payload.email != user.email:
-        exists = await db.execute(select(Users).where(Users.email == payload.email, Users.id != user_id))
-        if exists.scalars().first():
+        exists = await db.execute(EMAIL_TAKEN_BY_OTHER, {"email": payload.email, "user_id": user_id})
+        if exists.first():
             raise HTTPException(status_code=409, detail="Email already exists")
 
     if payload.name is not None: user.name = payload.name
@@ -1,9 +1,12 @@
-from sqlalchemy import Column, String, Integer, DateTime, func
+from sqlalchemy import Column, String, Integer, DateTime, Sequence, func
 from sqlalchemy.dialects.postgresql import UUID
 from uuid import uuid4
 from src.utils.db_utils import Base
 from sqlalchemy.orm import relationship
 
+# global ordering for availability change events (see src/utils/availability_feed.py)
+availability_seq = Sequence("book_availability_seq", metadata=Base.metadata)
+
 class Books(Base):
     __tablename__ = "books"  
 
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, String, Integer, LargeBinary, DateTime, func
+from src.utils.db_utils import Base
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # a key is scoped to the endpoint it was first used on
+    key = Column(String(255), primary_key=True)
+    method = Column(String(10), primary_key=True)
+    path = Column(String(255), primary_key=True)
+
+    request_hash = Column(String(64), nullable=False)
+
+    # NULL while the first request is still running
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String(255), nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+
+    # in-progress lease: identifies the request executing the key; once locked_until
+    # passes without a response, a retry may take the claim over
+    claim_token = Column(String(32), nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -15,7 +15,10 @@ class Rental(Base):
     quantity = Column(Integer, nullable=False, default=1)
 
     # lifecycle
-    rented_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # indexed for the incremental recommendation refresh (rented_at >= watermark);
+    # create_all() won't add it to an existing table, so there run by hand:
+    #   CREATE INDEX CONCURRENTLY ix_rentals_rented_at ON rentals (rented_at);
+    rented_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
     due_date = Column(Date, nullable=False)
     returned_at = Column(DateTime(timezone=True), nullable=True)
 
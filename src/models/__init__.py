@@ -1,5 +1,6 @@
 from .Books import Books
 from .Users import Users
 from .RentalReq import Rental
+from .IdempotencyKeys import IdempotencyKey
 
-__all__ = ["Books", "Users", "Rental"]
+__all__ = ["Books", "Users", "Rental", "IdempotencyKey"]
@@ -42,3 +42,7 @@ class Book(BaseModel):
 
     class Config:
         from_attributes = True
+
+class RelatedBook(BaseModel):
+    book_id: UUID
+    score: int  # number of patrons who rented both books
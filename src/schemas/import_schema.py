@@ -0,0 +1,34 @@
+from pydantic import BaseModel
+from uuid import UUID
+from typing import List, Optional
+from datetime import datetime
+
+class ImportReject(BaseModel):
+    line: int  # physical line in the uploaded file (header is line 1)
+    reason: str
+
+    class Config:
+        from_attributes = True
+
+class ImportJob(BaseModel):
+    id: UUID
+    filename: Optional[str] = None
+    encoding: str  # the upload is decoded with this; undecodable rows are rejected
+    status: str  # receiving | queued | running | succeeded | failed
+    bytes_received: int
+    bytes_processed: int
+    progress: Optional[float] = None  # 0..1 of the uploaded file
+    rows_processed: int
+    rows_written: int
+    rows_rejected: int
+    reject_samples: List[ImportReject]  # first few rejected rows
+    rows_per_second: Optional[float] = None
+    bytes_per_second: Optional[float] = None
+    elapsed_seconds: Optional[float] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,250 @@
+import asyncio
+import json
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from settings import (
+    ADMISSION_MAX_IN_FLIGHT,
+    ADMISSION_MAX_WAIT_SECONDS,
+    ADMISSION_POOL_WAIT_BUDGET_MS,
+    ADMISSION_RESERVED_FOR_WRITES,
+)
+from src.utils.db_utils import pool_capacity
+from src.utils.idempotency import idempotency_store
+from src.utils.import_jobs import import_jobs
+from src.utils.recommendations import recommendations
+
+# requests that must never be queued or shed (long-lived streams, health, docs)
+EXEMPT_PATHS = {"/", "/books/changes", "/docs", "/redoc", "/openapi.json", "/_debug/admission"}
+
+
+@dataclass
+class RouteClass:
+    name: str
+    priority: int  # lower is admitted first
+    limit: int  # max concurrent requests of this class
+    max_queue: int  # max requests of this class waiting for a slot
+    read_only: bool = False  # reads can't use reserved slots and are shed first
+    in_flight: int = 0
+    admitted: int = 0
+    queued: int = 0
+    shed: int = 0
+    waiters: deque = field(default_factory=deque)
+
+
+def default_route_classes() -> list[RouteClass]:
+    return [
+        RouteClass("checkout", priority=0, limit=10, max_queue=200),  # POST /rent, /return
+        RouteClass("write", priority=1, limit=5, max_queue=50),  # other mutations
+        RouteClass("browse", priority=2, limit=12, max_queue=100, read_only=True),  # GET by id / lists
+        RouteClass("search", priority=3, limit=4, max_queue=20, read_only=True),  # GET /books?q=
+    ]
+
+
+def classify(method: str, path: str, query_string: bytes = b"") -> Optional[str]:
+    if path in EXEMPT_PATHS or (method == "GET" and path.endswith("/related")):
+        # /books/{id}/related is served from memory and never touches the pool
+        return None
+    if path == "/imports" or path.startswith("/imports/"):
+        # uploads only spool to disk; the import worker pool bounds their database use
+        return None
+    if method == "POST" and path in ("/rent", "/return"):
+        return "checkout"
+    if method not in ("GET", "HEAD"):
+        return "write"
+    if path == "/books" and b"q=" in query_string:
+        return "search"
+    return "browse"
+
+
+def background_pool_connections() -> int:
+    """
+    Pool connections the background services may hold at any time. The analytics
+    snapshot and the availability feed use their own connections, not the pool.
+    """
+    return recommendations.pool_connections + import_jobs.pool_connections + idempotency_store.pool_connections
+
+
+def request_pool_slots() -> int:
+    """Pool connections left for requests: pool_size + max_overflow minus background use."""
+    return max(1, pool_capacity() - background_pool_connections())
+
+
+class AdmissionController:
+    """
+    Priority admission in front of the connection pool.
+
+    At most `max_in_flight` requests run at once (the pool connections left for
+    requests, see request_pool_slots), each
+    route class has its own concurrency limit, and freed slots go to the highest
+    priority waiter first. Reads may not take the last `reserved_for_writes` slots.
+    A request is shed (503) when its class queue is full, when it waited longer than
+    `max_wait_seconds`, or, for reads, when pool checkout is already slower than
+    `pool_wait_budget_ms` and it would have to queue.
+    """
+
+    def __init__(
+        self,
+        classes: list[RouteClass],
+        max_in_flight: int,
+        max_wait_seconds: float,
+        pool_wait_budget_ms: float,
+        reserved_for_writes: int = 0,
+    ):
+        self.classes = {c.name: c for c in classes}
+        self._by_priority = sorted(classes, key=lambda c: c.priority)
+        self.max_in_flight = max_in_flight
+        self.max_wait_seconds = max_wait_seconds
+        self.pool_wait_budget_ms = pool_wait_budget_ms
+        # reads always keep at least one slot
+        self.reserved_for_writes = min(reserved_for_writes, max_in_flight - 1)
+        self.in_flight = 0
+        self.pool_wait_ms = 0.0  # EWMA of session connection checkout time
+
+    def record_pool_wait(self, ms: float) -> None:
+        self.pool_wait_ms = 0.8 * self.pool_wait_ms + 0.2 * ms
+
+    def _has_slot(self, c: RouteClass) -> bool:
+        if c.in_flight >= c.limit:
+            return False
+        cap = self.max_in_flight - (self.reserved_for_writes if c.read_only else 0)
+        return self.in_flight < cap
+
+    def _grant(self, c: RouteClass) -> None:
+        c.in_flight += 1
+        c.admitted += 1
+        self.in_flight += 1
+
+    def _blocked_by(self, c: RouteClass) -> bool:
+        # FIFO within a class; across classes, only defer to waiters that are stuck on
+        # global capacity (a class at its own limit must not block the others)
+        if c.waiters:
+            return True
+        return any(
+            o.waiters and o.in_flight < o.limit
+            for o in self._by_priority if o.priority < c.priority
+        )
+
+    async def acquire(self, name: str) -> bool:
+        c = self.classes[name]
+        if self._has_slot(c) and not self._blocked_by(c):
+            self._grant(c)
+            return True
+
+        overloaded = c.read_only and self.pool_wait_ms > self.pool_wait_budget_ms
+        if len(c.waiters) >= c.max_queue or overloaded:
+            c.shed += 1
+            return False
+
+        fut = asyncio.get_running_loop().create_future()
+        c.waiters.append(fut)
+        c.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout=self.max_wait_seconds)
+            return True
+        except asyncio.TimeoutError:
+            if fut.done():  # granted just as the timer fired
+                return True
+            fut.cancel()
+            c.waiters.remove(fut)
+            c.shed += 1
+            return False
+        except asyncio.CancelledError:
+            if fut.done():
+                self.release(name)
+            else:
+                fut.cancel()
+                c.waiters.remove(fut)
+            raise
+
+    def release(self, name: str) -> None:
+        c = self.classes[name]
+        c.in_flight -= 1
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        for c in self._by_priority:
+            while c.waiters and self._has_slot(c):
+                fut = c.waiters.popleft()
+                if fut.done():
+                    continue
+                self._grant(c)
+                fut.set_result(True)
+            if c.waiters and c.in_flight < c.limit:
+                # out of global slots: lower priority classes keep waiting
+                return
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.max_wait_seconds + self.pool_wait_ms / 1000))
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "reserved_for_writes": self.reserved_for_writes,
+            "pool_wait_ms": round(self.pool_wait_ms, 3),
+            "pool_wait_budget_ms": self.pool_wait_budget_ms,
+            "classes": {
+                c.name: {
+                    "priority": c.priority,
+                    "limit": c.limit,
+                    "in_flight": c.in_flight,
+                    "waiting": len(c.waiters),
+                    "admitted": c.admitted,
+                    "queued": c.queued,
+                    "shed": c.shed,
+                }
+                for c in self._by_priority
+            },
+        }
+
+
+class AdmissionMiddleware:
+    """
+    Applies AdmissionController to HTTP requests; shed requests get
+    503 with a `Retry-After` header instead of piling up on the pool.
+    """
+
+    def __init__(self, app, controller: "AdmissionController"):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = classify(scope["method"], scope["path"], scope.get("query_string", b""))
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.controller.acquire(name):
+            body = json.dumps({"detail": "Server is busy, please retry"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.controller.retry_after()).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(name)
+
+
+admission = AdmissionController(
+    default_route_classes(),
+    max_in_flight=int(ADMISSION_MAX_IN_FLIGHT) if ADMISSION_MAX_IN_FLIGHT else request_pool_slots(),
+    max_wait_seconds=ADMISSION_MAX_WAIT_SECONDS,
+    pool_wait_budget_ms=ADMISSION_POOL_WAIT_BUDGET_MS,
+    reserved_for_writes=ADMISSION_RESERVED_FOR_WRITES,
+)
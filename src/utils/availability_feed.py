@@ -0,0 +1,169 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Optional
+
+import psycopg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from settings import AVAILABILITY_FEED_BACKLOG, AVAILABILITY_FEED_QUEUE_SIZE
+from src.utils.db_utils import get_psycopg_conninfo
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "book_availability"
+
+# NOTIFY is transactional: the event is only delivered if the surrounding commit succeeds.
+# `seq` is taken before commit, so it identifies an event but does not order it:
+# listeners receive notifications in commit order, which is what catch-up relies on
+_NOTIFY_STMT = text(
+    "SELECT pg_notify(:channel, json_build_object("
+    "'seq', nextval('book_availability_seq'), "
+    "'book_id', CAST(:book_id AS text), "
+    "'available_copies', CAST(:available_copies AS integer), "
+    "'total_copies', CAST(:total_copies AS integer))::text)"
+)
+
+
+async def publish_availability(db: AsyncSession, book) -> None:
+    """
+    Queue an availability change for `book` in the current transaction.
+    Call after mutating the book and before `commit()`.
+    """
+    await db.execute(_NOTIFY_STMT, {
+        "channel": CHANNEL,
+        "book_id": str(book.id),
+        "available_copies": book.available_copies,
+        "total_copies": book.total_copies,
+    })
+
+
+class Subscription:
+    def __init__(self, book_ids: Optional[set[str]], maxsize: int):
+        self.book_ids = book_ids
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def wants(self, event: dict) -> bool:
+        return self.book_ids is None or event.get("book_id") in self.book_ids
+
+    def push(self, event: dict) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # slow consumer: tell it to resync instead of buffering without bound
+            self.overflowed = True
+            self.queue = asyncio.Queue()
+            self.queue.put_nowait({"type": "reset"})
+
+
+class AvailabilityFeed:
+    """
+    One shared LISTEN connection per worker, fanned out to in-process subscribers.
+
+    Recent events are kept in a bounded backlog, in delivery order, so reconnecting
+    clients can catch up from their last seen `seq` (a global Postgres sequence, so
+    ids are valid on every worker). Postgres delivers notifications to all listeners
+    in commit order, while seq values are allocated before commit and may arrive out
+    of order; catch-up therefore replays everything delivered after the event with
+    that id rather than every event with a larger id. If that event is not in the
+    backlog (it fell out, this worker restarted or has not received it yet) or the
+    LISTEN connection was lost, subscribers receive a `reset` event and should re-read
+    the books they display.
+    """
+
+    def __init__(self, channel: str = CHANNEL, backlog: int = 1000, queue_size: int = 1000):
+        self.channel = channel
+        self.queue_size = queue_size
+        self._backlog: deque[dict] = deque(maxlen=backlog)
+        self._subscribers: set[Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.connected = False
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.connected = False
+
+    async def _run(self) -> None:
+        delay = 1.0
+        first = True
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(get_psycopg_conninfo(), autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {self.channel}")
+                    self.connected = True
+                    delay = 1.0
+                    if not first:
+                        # anything published while we were disconnected is lost
+                        self._backlog.clear()
+                        self._broadcast({"type": "reset"})
+                    first = False
+                    async for notify in conn.notifies():
+                        try:
+                            event = json.loads(notify.payload)
+                        except ValueError:
+                            logger.warning("Ignoring malformed availability payload: %r", notify.payload)
+                            continue
+                        self.dispatch(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Availability feed connection failed; retrying in %.0fs", delay)
+            self.connected = False
+            first = False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    def dispatch(self, event: dict) -> None:
+        event.setdefault("type", "availability")
+        self._backlog.append(event)
+        self._broadcast(event)
+
+    def _broadcast(self, event: dict) -> None:
+        for sub in list(self._subscribers):
+            if event["type"] == "reset" or sub.wants(event):
+                sub.push(event)
+
+    def subscribe(self, book_ids: Optional[set[str]] = None, last_seq: Optional[int] = None) -> Subscription:
+        """
+        Register a subscriber, pre-filled with the backlog events delivered after the
+        one with id `last_seq`, or with a `reset` if that event is not in the backlog.
+        """
+        sub = Subscription(book_ids, self.queue_size)
+        if last_seq is not None:
+            missed = self._delivered_after(last_seq)
+            if missed is None:
+                sub.push({"type": "reset"})
+            else:
+                for event in missed:
+                    if sub.wants(event):
+                        sub.push(event)
+        self._subscribers.add(sub)
+        return sub
+
+    def _delivered_after(self, seq: int) -> Optional[list[dict]]:
+        events = list(self._backlog)
+        for i in range(len(events) - 1, -1, -1):
+            if events[i].get("seq") == seq:
+                return events[i + 1:]
+        return None
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self._subscribers.discard(sub)
+
+
+availability_feed = AvailabilityFeed(backlog=AVAILABILITY_FEED_BACKLOG, queue_size=AVAILABILITY_FEED_QUEUE_SIZE)
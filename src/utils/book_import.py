@@ -0,0 +1,113 @@
+"""
+Row normalization for book CSVs (our own columns or the Book-Crossing dump),
+shared by scripts/import_books_async.py and the HTTP import jobs.
+"""
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.Books import Books
+from src.utils.availability_feed import publish_availability
+from src.utils.statements import BOOK_BY_ISBN, BOOK_BY_TITLE_AUTHOR
+
+# --- header mapping: Book-Crossing & our schema ---
+HEADER_MAP = {
+    "isbn": {"isbn", "ISBN"},
+    "title": {"title", "Book-Title"},
+    "author": {"author", "Book-Author"},
+    "published_year": {"published_year", "Year-Of-Publication", "year"},
+    "publisher": {"publisher", "Publisher"},
+    "image_url_s": {"image_url_s", "Image-URL-S"},
+    "image_url_m": {"image_url_m", "Image-URL-M"},
+    "image_url_l": {"image_url_l", "Image-URL-L"},
+    "total_copies": {"total_copies", "so_luong", "ton_kho"},
+}
+
+def _to_int(v: Optional[str], default: Optional[int]=None) -> Optional[int]:
+    try:
+        return int(v) if v not in (None, "") else default
+    except ValueError:
+        return default
+
+def _pick(d: dict, keys: set[str], default=None):
+    # keys can include quotes in Book-Crossing; strip quotes for matching
+    keyset = {k.strip('"') for k in d.keys()}
+    for k in keys:
+        if k in d:
+            val = d[k]
+            return val if val != "" else default
+        if k in keyset:
+            # try unquoted lookup
+            for raw in d.keys():
+                if raw.strip('"') == k:
+                    val = d[raw]
+                    return val if val != "" else default
+    return default
+
+def sniff_delimiter(p: Path) -> str:
+    # detect ; vs , using first non-empty line; counted on the raw bytes, so it
+    # works before the encoding is known (UTF-8, Latin-1, cp1252, ...)
+    with p.open("rb") as f:
+        sample = b""
+        for line in f:
+            if line.strip():
+                sample = line
+                break
+    return ";" if sample.count(b";") > sample.count(b",") else ","
+
+
+async def upsert_book(db: AsyncSession, row: dict) -> bool:
+    # normalize one row to our fields
+    title = (_pick(row, HEADER_MAP["title"]) or "").strip()
+    author = (_pick(row, HEADER_MAP["author"]) or "").strip()
+    year = _to_int(_pick(row, HEADER_MAP["published_year"]))
+    publisher = (_pick(row, HEADER_MAP["publisher"]) or None)
+    isbn = (_pick(row, HEADER_MAP["isbn"]) or None)
+    image_url_s = (_pick(row, HEADER_MAP["image_url_s"]) or None)
+    image_url_m = (_pick(row, HEADER_MAP["image_url_m"]) or None)
+    image_url_l = (_pick(row, HEADER_MAP["image_url_l"]) or None)
+    total_copies = _to_int(_pick(row, HEADER_MAP["total_copies"]), 1) or 1
+
+    # minimal required
+    if not title or not author or year is None:
+        return False
+
+    # upsert by ISBN then by (title, author)
+    book = None
+    if isbn:
+        res = await db.execute(BOOK_BY_ISBN, {"isbn": isbn})
+        book = res.scalars().first()
+    if not book:
+        res = await db.execute(BOOK_BY_TITLE_AUTHOR, {"title": title, "author": author})
+        book = res.scalars().first()
+
+    if book:
+        diff = total_copies - (book.total_copies or 0)
+        book.title = title
+        book.author = author
+        book.published_year = year
+        book.publisher = publisher
+        book.isbn = isbn
+        book.image_url_s = image_url_s
+        book.image_url_m = image_url_m
+        book.image_url_l = image_url_l
+        book.total_copies = total_copies
+        book.available_copies = max(0, (book.available_copies or 0) + diff)
+        db.add(book)
+        if diff:
+            await publish_availability(db, book)
+    else:
+        db.add(Books(
+            title=title,
+            author=author,
+            published_year=year,
+            publisher=publisher,
+            isbn=isbn,
+            image_url_s=image_url_s,
+            image_url_m=image_url_m,
+            image_url_l=image_url_l,
+            total_copies=total_copies,
+            available_copies=total_copies,
+        ))
+    return True
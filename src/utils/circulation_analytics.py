@@ -0,0 +1,407 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from functools import cached_property
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import Float, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from settings import ANALYTICS_DATABASE_URL, ANALYTICS_SNAPSHOT_TTL_SECONDS
+from src.models.Books import Books
+from src.models.RentalReq import Rental
+from src.utils.db_utils import get_database_url
+
+logger = logging.getLogger(__name__)
+
+STREAM_BATCH = 100_000
+SECONDS_PER_DAY = 86400.0
+# loan duration histogram edges in days; the last bucket is open-ended
+DURATION_EDGES = np.array([0, 1, 3, 7, 14, 21, 30, 60, 90], dtype=np.float64)
+GROUPS = ("none", "publisher", "year", "published_year")
+
+
+def _day(d: date) -> int:
+    return (d - date(1970, 1, 1)).days
+
+
+def _iso(day: int) -> str:
+    return (date(1970, 1, 1) + timedelta(days=int(day))).isoformat()
+
+
+def _span(values: np.ndarray) -> tuple[int, int]:
+    # (min, max) of the values; (0, -1), an empty range, when there are none
+    if not len(values):
+        return 0, -1
+    return int(values.min()), int(values.max())
+
+
+@dataclass
+class CirculationSnapshot:
+    """
+    Column arrays for `books` and `rentals` (rentals already joined to their book's
+    publisher / published_year). Times are days since 1970-01-01; `returned` is NaN for
+    active loans. All reports are vectorised group-bys over these arrays.
+    """
+
+    taken_at: datetime
+    as_of: float
+    publishers: list[Optional[str]]
+    book_publisher: np.ndarray
+    book_published_year: np.ndarray
+    book_copies: np.ndarray
+    rental_publisher: np.ndarray
+    rental_published_year: np.ndarray
+    rented: np.ndarray
+    due: np.ndarray
+    returned: np.ndarray
+    quantity: np.ndarray
+
+    @property
+    def rentals(self) -> int:
+        return len(self.rented)
+
+    # -- grouping ---------------------------------------------------------
+
+    def _codes(self, group: str, for_books: bool = False) -> tuple[np.ndarray, list]:
+        if group not in GROUPS:
+            raise ValueError(f"group must be one of {', '.join(GROUPS)}")
+        if group == "none":
+            n = len(self.book_copies) if for_books else self.rentals
+            return np.zeros(n, dtype=np.int64), ["all"]
+        if group == "publisher":
+            codes = self.book_publisher if for_books else self.rental_publisher
+            return codes.astype(np.int64), self.publishers
+        if group == "published_year":
+            # years are a small dense range: offset codes instead of sorting with np.unique;
+            # books and rentals share the same label space
+            lo, hi = self.published_year_range
+            values = self.book_published_year if for_books else self.rental_published_year
+            return values.astype(np.int64) - lo, list(range(lo, hi + 1))
+        if for_books:
+            raise ValueError("group 'year' (rental year) is not available for this report")
+        years = self.rental_year
+        lo, hi = _span(years)
+        return years - lo, list(range(lo, hi + 1))
+
+    @cached_property
+    def published_year_range(self) -> tuple[int, int]:
+        return _span(np.concatenate((self.book_published_year, self.rental_published_year)))
+
+    @cached_property
+    def rented_day(self) -> np.ndarray:
+        return np.floor(self.rented)
+
+    @cached_property
+    def rental_year(self) -> np.ndarray:
+        return self.rented_day.astype("datetime64[D]").astype("datetime64[Y]").astype(np.int64) + 1970
+
+    @cached_property
+    def loan_end_day(self) -> np.ndarray:
+        # a loan occupies [rented_day, loan_end_day); active loans run through the snapshot day
+        return np.where(np.isnan(self.returned), np.floor(self.as_of) + 1, np.floor(self.returned))
+
+    def _window(self, start: int, end: int) -> np.ndarray:
+        return (self.rented_day >= start) & (self.rented_day <= end)
+
+    @staticmethod
+    def _top(order_by: np.ndarray, top: int) -> np.ndarray:
+        nonzero = np.flatnonzero(order_by > 0)
+        return nonzero[np.argsort(-order_by[nonzero], kind="stable")][:top]
+
+    # -- reports ----------------------------------------------------------
+
+    def utilization(self, start: int, end: int, granularity: str = "day", group: str = "none", top: int = 20) -> dict:
+        """
+        Share of copies on loan per day (or averaged per ISO week) in [start, end].
+        Copies are today's total_copies per book.
+        """
+        days = end - start + 1
+        if days <= 0:
+            raise ValueError("end must not be before start")
+        book_codes, labels = self._codes(group, for_books=True)
+        rental_codes, _ = self._codes(group)
+        n_groups = len(labels)
+
+        loan_start = np.clip(self.rented_day - start, 0, days).astype(np.int64)
+        loan_end = np.clip(self.loan_end_day - start, 0, days).astype(np.int64)
+        live = loan_end > loan_start
+
+        width = days + 1
+        size = n_groups * width
+        weights = self.quantity[live].astype(np.float64)
+        diff = np.bincount(rental_codes[live] * width + loan_start[live], weights=weights, minlength=size)
+        diff -= np.bincount(rental_codes[live] * width + loan_end[live], weights=weights, minlength=size)
+        on_loan = diff.reshape(n_groups, width)[:, :days].cumsum(axis=1)
+
+        copies = np.bincount(book_codes, weights=self.book_copies.astype(np.float64), minlength=n_groups)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            util = np.where(copies[:, None] > 0, on_loan / copies[:, None], 0.0)
+
+        day_numbers = np.arange(start, end + 1)
+        if granularity == "week":
+            week = (day_numbers + 3) // 7  # 1970-01-05 was a Monday
+            bounds = np.flatnonzero(np.r_[True, week[1:] != week[:-1]])
+            counts = np.diff(np.r_[bounds, days])
+            util = np.add.reduceat(util, bounds, axis=1) / counts
+            periods = day_numbers[bounds]
+        elif granularity == "day":
+            periods = day_numbers
+        else:
+            raise ValueError("granularity must be 'day' or 'week'")
+
+        period_labels = [_iso(d) for d in periods]
+        rows = []
+        for g in self._top(copies, top) if n_groups > 1 else range(n_groups):
+            rows.append({
+                "group": labels[g],
+                "copies": int(copies[g]),
+                "average": round(float(util[g].mean()), 4) if util.shape[1] else 0.0,
+                "series": [{"period": p, "utilization": round(float(u), 4)} for p, u in zip(period_labels, util[g])],
+            })
+        return {"start": _iso(start), "end": _iso(end), "granularity": granularity, "group": group, "groups": rows}
+
+    def loan_durations(self, start: int, end: int, group: str = "none", top: int = 20) -> dict:
+        """
+        Distribution of loan length (days) for loans started in [start, end] and already returned.
+        """
+        codes, labels = self._codes(group)
+        mask = self._window(start, end) & ~np.isnan(self.returned)
+        g = codes[mask]
+        dur = self.returned[mask] - self.rented[mask]
+        n_groups, n_bins = len(labels), len(DURATION_EDGES)
+
+        bins = np.clip(np.searchsorted(DURATION_EDGES, dur, side="right") - 1, 0, n_bins - 1)
+        hist = np.bincount(g * n_bins + bins, minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+        counts = hist.sum(axis=1)
+        sums = np.bincount(g, weights=dur, minlength=n_groups)
+
+        # percentiles: one float sort on group * 1e6 + duration (much cheaper than lexsort)
+        # lines each group's durations up in order; subtracting the offset recovers them
+        keys = np.sort(g * 1e6 + dur)
+        sorted_dur = keys - np.floor(keys / 1e6) * 1e6
+        offsets = np.r_[0, np.cumsum(counts)[:-1]]
+
+        def pct(p: float) -> np.ndarray:
+            if not len(sorted_dur):
+                return np.zeros(n_groups)
+            idx = offsets + np.floor(p * np.maximum(counts - 1, 0)).astype(np.int64)
+            return np.where(counts > 0, sorted_dur[np.minimum(idx, len(sorted_dur) - 1)], 0.0)
+
+        p50, p90, p99 = pct(0.5), pct(0.9), pct(0.99)
+        bucket_labels = [
+            f"{int(lo)}-{int(hi)}d" for lo, hi in zip(DURATION_EDGES[:-1], DURATION_EDGES[1:])
+        ] + [f"{int(DURATION_EDGES[-1])}d+"]
+
+        rows = []
+        for i in self._top(counts, top) if n_groups > 1 else range(n_groups):
+            rows.append({
+                "group": labels[i],
+                "loans": int(counts[i]),
+                "mean_days": round(float(sums[i] / counts[i]), 2) if counts[i] else 0.0,
+                "p50_days": round(float(p50[i]), 2),
+                "p90_days": round(float(p90[i]), 2),
+                "p99_days": round(float(p99[i]), 2),
+                "histogram": dict(zip(bucket_labels, (int(n) for n in hist[i]))),
+            })
+        return {"start": _iso(start), "end": _iso(end), "group": group, "groups": rows}
+
+    def overdue(self, start: int, end: int, group: str = "none", top: int = 20) -> dict:
+        """
+        Overdue rate for loans started in [start, end]: returned after the due date,
+        or still out with the due date already passed.
+        """
+        codes, labels = self._codes(group)
+        mask = self._window(start, end)
+        g = codes[mask]
+        returned = self.returned[mask]
+        due = self.due[mask]
+        active = np.isnan(returned)
+
+        late = ~active & (np.floor(np.nan_to_num(returned)) > due)
+        still_out = active & (np.floor(self.as_of) > due)
+        n_groups = len(labels)
+        totals = np.bincount(g, minlength=n_groups)
+        late_n = np.bincount(g, weights=late, minlength=n_groups)
+        out_n = np.bincount(g, weights=still_out, minlength=n_groups)
+
+        rows = []
+        for i in self._top(totals, top) if n_groups > 1 else range(n_groups):
+            rows.append({
+                "group": labels[i],
+                "loans": int(totals[i]),
+                "returned_late": int(late_n[i]),
+                "overdue_now": int(out_n[i]),
+                "overdue_rate": round(float((late_n[i] + out_n[i]) / totals[i]), 4) if totals[i] else 0.0,
+            })
+        return {"start": _iso(start), "end": _iso(end), "group": group, "groups": rows}
+
+
+def _epoch_seconds(column):
+    return cast(func.coalesce(func.extract("epoch", column), -1), Float)
+
+
+async def load_snapshot(engine: AsyncEngine) -> CirculationSnapshot:
+    """
+    Stream `books` and `rentals` into column arrays, STREAM_BATCH rows at a time.
+    Each partition is converted in a worker thread so the event loop keeps serving.
+    """
+    taken_at = datetime.now(timezone.utc)
+    publisher_codes: dict[Optional[str], int] = {}
+
+    def encode(names) -> np.ndarray:
+        return np.fromiter((publisher_codes.setdefault(n, len(publisher_codes)) for n in names), dtype=np.int32)
+
+    book_cols: dict[str, list[np.ndarray]] = {"publisher": [], "year": [], "copies": []}
+    rental_cols: dict[str, list[np.ndarray]] = {
+        "publisher": [], "year": [], "rented": [], "due": [], "returned": [], "quantity": [],
+    }
+
+    def add_books(rows) -> None:
+        pub, year, copies = zip(*rows)
+        book_cols["publisher"].append(encode(pub))
+        book_cols["year"].append(np.asarray(year, dtype=np.int32))
+        book_cols["copies"].append(np.asarray(copies, dtype=np.int32))
+
+    def add_rentals(rows) -> None:
+        pub, year, rented, due, returned, quantity = zip(*rows)
+        returned = np.asarray(returned, dtype=np.float64)
+        returned[returned < 0] = np.nan
+        rental_cols["publisher"].append(encode(pub))
+        rental_cols["year"].append(np.asarray(year, dtype=np.int32))
+        rental_cols["rented"].append(np.asarray(rented, dtype=np.float64) / SECONDS_PER_DAY)
+        rental_cols["due"].append((np.asarray(due, dtype=np.float64) // SECONDS_PER_DAY).astype(np.int32))
+        rental_cols["returned"].append(returned / SECONDS_PER_DAY)
+        rental_cols["quantity"].append(np.asarray(quantity, dtype=np.int32))
+
+    async with engine.connect() as conn:
+        result = await conn.stream(
+            select(Books.publisher, Books.published_year, Books.total_copies)
+            .execution_options(yield_per=STREAM_BATCH)
+        )
+        async for rows in result.partitions(STREAM_BATCH):
+            await asyncio.to_thread(add_books, rows)
+
+        result = await conn.stream(
+            select(
+                Books.publisher, Books.published_year,
+                _epoch_seconds(Rental.rented_at), _epoch_seconds(Rental.due_date), _epoch_seconds(Rental.returned_at),
+                Rental.quantity,
+            )
+            .join(Books, Books.id == Rental.book_id)
+            .execution_options(yield_per=STREAM_BATCH)
+        )
+        async for rows in result.partitions(STREAM_BATCH):
+            await asyncio.to_thread(add_rentals, rows)
+
+    def cat(parts: list[np.ndarray], dtype) -> np.ndarray:
+        return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+    return await asyncio.to_thread(lambda: CirculationSnapshot(
+        taken_at=taken_at,
+        as_of=taken_at.timestamp() / SECONDS_PER_DAY,
+        publishers=list(publisher_codes),
+        book_publisher=cat(book_cols["publisher"], np.int32),
+        book_published_year=cat(book_cols["year"], np.int32),
+        book_copies=cat(book_cols["copies"], np.int32),
+        rental_publisher=cat(rental_cols["publisher"], np.int32),
+        rental_published_year=cat(rental_cols["year"], np.int32),
+        rented=cat(rental_cols["rented"], np.float64),
+        due=cat(rental_cols["due"], np.int32),
+        returned=cat(rental_cols["returned"], np.float64),
+        quantity=cat(rental_cols["quantity"], np.int32),
+    ))
+
+
+class SnapshotNotReady(Exception):
+    pass
+
+
+class AnalyticsService:
+    """
+    Holds the current snapshot and memoises report results per snapshot, so repeated
+    dashboard loads cost a dict lookup. A background task (started from the lifespan)
+    reloads the snapshot every `ttl_seconds`; reports keep being served from the
+    previous snapshot while the next one loads, and requests never trigger a scan.
+    The scan uses its own single-connection engine, pointed at ANALYTICS_DATABASE_URL
+    (e.g. a replica) when it is set, so it never takes a connection from the API pool.
+    """
+
+    MAX_CACHED_REPORTS = 256
+    RETRY_SECONDS = 30.0
+
+    def __init__(self, ttl_seconds: float, database_url: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.database_url = database_url
+        self.snapshot: Optional[CirculationSnapshot] = None
+        self.load_seconds: Optional[float] = None
+        self._engine: Optional[AsyncEngine] = None
+        self._task: Optional[asyncio.Task] = None
+        self._cache: dict[tuple, dict] = {}
+
+    def _get_engine(self) -> AsyncEngine:
+        if self._engine is None:
+            self._engine = create_async_engine(self.database_url or get_database_url(), pool_size=1, max_overflow=0)
+        return self._engine
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.reload()
+                delay = self.ttl_seconds
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Analytics snapshot reload failed")
+                delay = min(self.RETRY_SECONDS, self.ttl_seconds)
+            await asyncio.sleep(delay)
+
+    async def reload(self) -> CirculationSnapshot:
+        started = time.perf_counter()
+        snapshot = await load_snapshot(self._get_engine())
+        self.load_seconds = time.perf_counter() - started
+        # swap in one step: reports in flight keep using the snapshot they started with
+        self.snapshot, self._cache = snapshot, {}
+        return snapshot
+
+    def get_snapshot(self) -> CirculationSnapshot:
+        if self.snapshot is None:
+            raise SnapshotNotReady()
+        return self.snapshot
+
+    async def report(self, name: str, start: Optional[date], end: Optional[date], **params) -> dict:
+        snapshot = self.get_snapshot()
+        cache = self._cache
+        end_day = _day(end) if end else int(np.floor(snapshot.as_of))
+        start_day = _day(start) if start else end_day - 89
+        key = (name, start_day, end_day, tuple(sorted(params.items())))
+        cached = cache.get(key)
+        if cached is None:
+            result = await asyncio.to_thread(getattr(snapshot, name), start_day, end_day, **params)
+            cached = {"snapshot_taken_at": snapshot.taken_at.isoformat(), "rentals": snapshot.rentals, **result}
+            if len(cache) >= self.MAX_CACHED_REPORTS:
+                cache.clear()
+            cache[key] = cached
+        return cached
+
+
+analytics = AnalyticsService(ttl_seconds=ANALYTICS_SNAPSHOT_TTL_SECONDS, database_url=ANALYTICS_DATABASE_URL)
@@ -0,0 +1,369 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from settings import (
+    IDEMPOTENCY_CLEANUP_SECONDS,
+    IDEMPOTENCY_LEASE_SECONDS,
+    IDEMPOTENCY_LRU_SIZE,
+    IDEMPOTENCY_TTL_SECONDS,
+)
+from src.models.IdempotencyKeys import IdempotencyKey
+from src.utils.db_utils import session_factory
+
+logger = logging.getLogger(__name__)
+
+HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+# (method, path) pairs that honour Idempotency-Key
+IDEMPOTENT_ROUTES = {("POST", "/rent"), ("POST", "/return"), ("POST", "/books"), ("POST", "/users")}
+
+
+@dataclass
+class StoredResponse:
+    request_hash: str
+    status_code: Optional[int]  # None while the original request is still running
+    content_type: Optional[str]
+    body: Optional[bytes]
+    expires_at: float  # epoch seconds
+
+
+@dataclass
+class IdempotencyContext:
+    """Per-request claim, exposed to routes as `request.state.idempotency`."""
+    scope_key: tuple  # (key, method, path)
+    request_hash: str
+    claim_token: str
+    recorded: Optional[StoredResponse] = None  # set by record_response(), before the route commits
+
+
+def _match(scope_key: tuple):
+    key, method, path = scope_key
+    return IdempotencyKey.key == key, IdempotencyKey.method == method, IdempotencyKey.path == path
+
+
+class IdempotencyStore:
+    """
+    Postgres table (`idempotency_keys`) with an in-process LRU in front of it.
+    The table makes keys visible to every worker; the LRU only ever holds completed
+    responses, which never change, so it needs no invalidation. Expired rows are
+    purged by a background task.
+
+    A claim carries a token and a lease (`locked_until`); the response is written by
+    the route in its own transaction (see record_response), so a key is completed
+    exactly when the writes it stands for are committed. A claim whose request died
+    before that can be taken over by a retry once the lease has run out.
+    """
+
+    # the cleanup task; claims and completions run inside the request's own admission slot
+    # and never while its session holds a connection
+    pool_connections = 1
+
+    def __init__(self, ttl_seconds: float, lease_seconds: float, lru_size: int, cleanup_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.lru_size = lru_size
+        self.cleanup_seconds = cleanup_seconds
+        self._lru: OrderedDict[tuple, StoredResponse] = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    def cached(self, scope_key: tuple) -> Optional[StoredResponse]:
+        entry = self._lru.get(scope_key)
+        if entry is None:
+            return None
+        if entry.expires_at < time.time():
+            del self._lru[scope_key]
+            return None
+        self._lru.move_to_end(scope_key)
+        return entry
+
+    def remember(self, scope_key: tuple, entry: StoredResponse) -> None:
+        self._lru[scope_key] = entry
+        self._lru.move_to_end(scope_key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    async def claim(self, ctx: IdempotencyContext) -> Optional[StoredResponse]:
+        """
+        Try to become the request that executes this key.
+        Returns None if we own it now, otherwise the existing record.
+        """
+        key, method, path = ctx.scope_key
+        match = _match(ctx.scope_key)
+        now = datetime.now(timezone.utc)
+        expires = now + timedelta(seconds=self.ttl_seconds)
+        lease = now + timedelta(seconds=self.lease_seconds)
+        async with session_factory() as db:
+            async with db.begin():
+                res = await db.execute(
+                    insert(IdempotencyKey)
+                    .values(key=key, method=method, path=path, request_hash=ctx.request_hash,
+                            claim_token=ctx.claim_token, locked_until=lease, expires_at=expires)
+                    .on_conflict_do_nothing()
+                    .returning(IdempotencyKey.key)
+                )
+                if res.first() is not None:
+                    return None
+
+                # take over an expired record not yet purged, or a stale claim for the
+                # same request whose executor never recorded a response
+                res = await db.execute(
+                    update(IdempotencyKey)
+                    .where(*match, or_(
+                        IdempotencyKey.expires_at < now,
+                        and_(IdempotencyKey.status_code.is_(None), IdempotencyKey.locked_until < now,
+                             IdempotencyKey.request_hash == ctx.request_hash),
+                    ))
+                    .values(request_hash=ctx.request_hash, status_code=None, content_type=None,
+                            response_body=None, claim_token=ctx.claim_token, locked_until=lease,
+                            created_at=now, expires_at=expires)
+                    .returning(IdempotencyKey.key)
+                )
+                if res.first() is not None:
+                    return None
+
+                row = (await db.execute(select(IdempotencyKey).where(*match))).scalars().first()
+        if row is None:  # purged between our statements; treat as owned next time round
+            return await self.claim(ctx)
+        entry = StoredResponse(row.request_hash, row.status_code, row.content_type, row.response_body,
+                               row.expires_at.timestamp())
+        if entry.status_code is not None:
+            self.remember(ctx.scope_key, entry)
+        return entry
+
+    def _complete_stmt(self, ctx: IdempotencyContext, status_code: int, content_type: Optional[str],
+                       body: bytes):
+        # only the current claim holder may complete the key
+        return (
+            update(IdempotencyKey)
+            .where(*_match(ctx.scope_key), IdempotencyKey.claim_token == ctx.claim_token,
+                   IdempotencyKey.status_code.is_(None))
+            .values(status_code=status_code, content_type=content_type, response_body=body,
+                    locked_until=None)
+            .returning(IdempotencyKey.key)
+        )
+
+    def _stored(self, ctx: IdempotencyContext, status_code: int, content_type: Optional[str],
+                body: bytes) -> StoredResponse:
+        return StoredResponse(ctx.request_hash, status_code, content_type, body, time.time() + self.ttl_seconds)
+
+    async def complete(self, ctx: IdempotencyContext, status_code: int, content_type: Optional[str],
+                       body: bytes) -> bool:
+        """
+        Save a response produced without business writes (validation errors, 404s, ...)
+        in its own transaction. False if the claim was lost to a takeover.
+        """
+        async with session_factory() as db:
+            async with db.begin():
+                res = await db.execute(self._complete_stmt(ctx, status_code, content_type, body))
+                if res.first() is None:
+                    return False
+        self.remember(ctx.scope_key, self._stored(ctx, status_code, content_type, body))
+        return True
+
+    async def release(self, ctx: IdempotencyContext) -> None:
+        # the request failed before producing a replayable response: let the client retry
+        async with session_factory() as db:
+            async with db.begin():
+                await db.execute(
+                    delete(IdempotencyKey)
+                    .where(*_match(ctx.scope_key), IdempotencyKey.claim_token == ctx.claim_token,
+                           IdempotencyKey.status_code.is_(None))
+                )
+
+    async def purge_expired(self) -> int:
+        async with session_factory() as db:
+            async with db.begin():
+                res = await db.execute(
+                    delete(IdempotencyKey).where(IdempotencyKey.expires_at < datetime.now(timezone.utc))
+                )
+        return res.rowcount or 0
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.cleanup_seconds)
+            try:
+                await self.purge_expired()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Idempotency key cleanup failed")
+
+
+async def record_response(db: AsyncSession, request: Request, content, status_code: int = 200) -> None:
+    """
+    Store the response for the request's Idempotency-Key in the route's transaction.
+    Call after the business writes are flushed and before `commit()`, so the key is
+    completed atomically with them; routes in IDEMPOTENT_ROUTES must do this on every
+    path that writes. A no-op for requests without a key.
+    """
+    ctx: Optional[IdempotencyContext] = getattr(request.state, "idempotency", None)
+    if ctx is None:
+        return
+    body = JSONResponse(jsonable_encoder(content), status_code=status_code).body
+    res = await db.execute(idempotency_store._complete_stmt(ctx, status_code, "application/json", body))
+    if res.first() is None:
+        # our lease ran out and a retry took the key over; let the transaction roll back
+        raise HTTPException(status_code=409, detail="Idempotency-Key was taken over by a retry")
+    ctx.recorded = idempotency_store._stored(ctx, status_code, "application/json", body)
+
+
+async def _send_json(send, status: int, detail: str, extra_headers: Optional[list] = None) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        + (extra_headers or []),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """
+    Honours `Idempotency-Key` on POST /rent, /return, /books and /users.
+
+    The first request with a key claims it in the store and runs normally; the route
+    saves its response with record_response() in the same transaction as its writes,
+    and responses without writes (anything below 500) are saved once the request is
+    done. A retry with the same key and the same body gets that response back
+    (`Idempotent-Replayed: true`) without touching the business tables; the same key
+    with a different body is a 422, and a retry while the first request is still
+    running (within its lease) is a 409.
+    """
+
+    def __init__(self, app, store: IdempotencyStore):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in IDEMPOTENT_ROUTES:
+            await self.app(scope, receive, send)
+            return
+        raw_key = dict(scope.get("headers", [])).get(HEADER)
+        if raw_key is None:
+            await self.app(scope, receive, send)
+            return
+        key = raw_key.decode("latin-1").strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+            return
+
+        # buffer the (small, JSON) body so it can be fingerprinted and then replayed to the app
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        ctx = IdempotencyContext(
+            scope_key=(key, scope["method"], scope["path"]),
+            request_hash=hashlib.sha256(body).hexdigest(),
+            claim_token=uuid.uuid4().hex,
+        )
+
+        existing = self.store.cached(ctx.scope_key) or await self.store.claim(ctx)
+        if existing is not None:
+            if existing.request_hash != ctx.request_hash:
+                await _send_json(send, 422, "Idempotency-Key was already used with a different request body")
+            elif existing.status_code is None:
+                await _send_json(send, 409, "A request with this Idempotency-Key is still in progress",
+                                 [(b"retry-after", b"1")])
+            else:
+                await self._replay(send, existing)
+            return
+
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status = None
+        content_type = None
+        response_chunks = []
+
+        async def capture_send(message):
+            nonlocal status, content_type
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type")
+            elif message["type"] == "http.response.body":
+                response_chunks.append(message.get("body", b""))
+            await send(message)
+
+        scope.setdefault("state", {})["idempotency"] = ctx
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        finally:
+            # runs after the route's session is closed, so this never needs a second
+            # pooled connection while the request still holds one
+            await self._finish(ctx, status, content_type, b"".join(response_chunks))
+
+    async def _finish(self, ctx: IdempotencyContext, status: Optional[int], content_type: Optional[bytes],
+                      body: bytes) -> None:
+        if ctx.recorded is not None and status == ctx.recorded.status_code:
+            # the route's commit went through (it would have failed the response otherwise),
+            # so the key was completed together with its writes
+            self.store.remember(ctx.scope_key, ctx.recorded)
+            return
+        try:
+            if status is not None and status < 500:
+                # a response without writes to commit: save it on its own, best effort
+                if await self.store.complete(ctx, status,
+                                             content_type.decode("latin-1") if content_type else None, body):
+                    return
+            await self.store.release(ctx)
+        except Exception:
+            # the lease lets a retry take the claim over once it runs out
+            logger.exception("Could not finish Idempotency-Key claim %s", ctx.scope_key)
+
+    @staticmethod
+    async def _replay(send, entry: StoredResponse) -> None:
+        body = entry.body or b""
+        headers = [(b"content-length", str(len(body)).encode()), (b"idempotent-replayed", b"true")]
+        if entry.content_type:
+            headers.append((b"content-type", entry.content_type.encode("latin-1")))
+        await send({"type": "http.response.start", "status": entry.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+idempotency_store = IdempotencyStore(
+    ttl_seconds=IDEMPOTENCY_TTL_SECONDS,
+    lease_seconds=IDEMPOTENCY_LEASE_SECONDS,
+    lru_size=IDEMPOTENCY_LRU_SIZE,
+    cleanup_seconds=IDEMPOTENCY_CLEANUP_SECONDS,
+)
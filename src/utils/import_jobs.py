@@ -0,0 +1,309 @@
+import asyncio
+import csv
+import logging
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy.exc import DBAPIError
+
+from settings import (
+    IMPORT_BATCH_ROWS,
+    IMPORT_JOB_HISTORY,
+    IMPORT_MAX_QUEUED,
+    IMPORT_SPOOL_DIR,
+    IMPORT_WORKERS,
+)
+from src.utils.book_import import sniff_delimiter, upsert_book
+from src.utils.db_utils import session_factory
+
+logger = logging.getLogger(__name__)
+
+MAX_REJECT_SAMPLES = 20
+MISSING_FIELDS = "missing title, author or published year"
+UNDECODABLE = "not valid {} text"
+FINISHED = ("succeeded", "failed")
+
+
+class ImportQueueFull(Exception):
+    pass
+
+
+@dataclass
+class ImportReject:
+    line: int
+    reason: str
+
+
+@dataclass
+class ImportJob:
+    id: uuid.UUID
+    filename: Optional[str]
+    spool_path: Path
+    encoding: str = "utf-8"
+    status: str = "receiving"  # receiving -> queued -> running -> succeeded | failed
+    bytes_received: int = 0
+    bytes_processed: int = 0
+    rows_processed: int = 0
+    rows_written: int = 0
+    rows_rejected: int = 0
+    reject_samples: list[ImportReject] = field(default_factory=list)
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    _started: Optional[float] = None  # monotonic, for rates
+    _finished: Optional[float] = None
+
+    @property
+    def elapsed_seconds(self) -> Optional[float]:
+        if self._started is None:
+            return None
+        return round((self._finished or time.monotonic()) - self._started, 3)
+
+    @property
+    def rows_per_second(self) -> Optional[float]:
+        elapsed = self.elapsed_seconds
+        return round(self.rows_processed / elapsed, 1) if elapsed else None
+
+    @property
+    def bytes_per_second(self) -> Optional[float]:
+        elapsed = self.elapsed_seconds
+        return round(self.bytes_processed / elapsed, 1) if elapsed else None
+
+    @property
+    def progress(self) -> Optional[float]:
+        # share of the spooled file parsed so far (rows are written in the same batch)
+        if self.status == "succeeded":
+            return 1.0
+        if self.status == "receiving" or not self.bytes_received:
+            return None
+        return round(min(1.0, self.bytes_processed / self.bytes_received), 4)
+
+    def reject(self, line: int, reason: str) -> None:
+        self.rows_rejected += 1
+        if len(self.reject_samples) < MAX_REJECT_SAMPLES:
+            self.reject_samples.append(ImportReject(line, reason))
+
+
+class _BatchReader:
+    """
+    Blocking CSV reader over a spooled upload; every call runs in a worker thread.
+    Reads bytes so the offset is known for progress, decoding line by line in the
+    job's declared encoding. Rows with a line that does not decode are set aside
+    (never written with replacement characters); an undecodable header fails the job.
+    """
+
+    def __init__(self, path: Path, encoding: str = "utf-8"):
+        self.delimiter = sniff_delimiter(path)
+        self.encoding = encoding
+        self._file = path.open("rb")
+        self.bytes_read = 0
+        self._line_no = 0
+        self._undecodable: set[int] = set()
+        self._reader = csv.DictReader(self._lines(), delimiter=self.delimiter)
+
+    def _lines(self):
+        for raw in self._file:
+            self.bytes_read += len(raw)
+            self._line_no += 1
+            try:
+                line = raw.decode(self.encoding)
+            except UnicodeDecodeError:
+                if self._line_no == 1:
+                    raise ValueError(f"CSV header is {UNDECODABLE.format(self.encoding)}")
+                # keep the csv reader in step; next_batch drops the row
+                self._undecodable.add(self._line_no)
+                line = raw.decode(self.encoding, errors="replace")
+            if self._line_no == 1:
+                line = line.lstrip("\ufeff")
+            yield line
+
+    def next_batch(self, size: int) -> tuple[list[tuple[int, dict]], list[int]]:
+        """Up to `size` rows, plus the lines of undecodable rows skipped on the way."""
+        batch, undecodable = [], []
+        while len(batch) < size:
+            start = self._reader.line_num
+            row = next(self._reader, None)
+            if row is None:
+                break
+            # a quoted field may span lines: the row covers start+1 .. line_num
+            bad = [n for n in range(start + 1, self._reader.line_num + 1) if n in self._undecodable]
+            if bad:
+                self._undecodable.difference_update(bad)
+                undecodable.append(self._reader.line_num)
+            else:
+                # a row with more fields than the header keeps the extras under None
+                batch.append((self._reader.line_num, row))
+        return batch, undecodable
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ImportJobManager:
+    """
+    In-process registry and bounded worker pool for POST /imports.
+
+    Uploads are spooled to disk by the request handler; at most `max_queued` jobs
+    may be receiving or waiting at once (`create` raises ImportQueueFull beyond that),
+    and `workers` tasks drain them. CSV parsing runs in a thread; rows go through
+    `upsert_book` and are committed one batch per transaction, so a worker holds a
+    pooled connection only while writing a batch. Job state lives in this process:
+    GET /imports/{id} must reach the worker process that accepted the upload.
+    """
+
+    def __init__(self, workers: int, max_queued: int, batch_rows: int,
+                 spool_dir: Optional[str], history: int):
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.batch_rows = max(1, batch_rows)
+        self.spool_dir = Path(spool_dir) if spool_dir else Path(tempfile.gettempdir()) / "library-imports"
+        self.history = history
+        self._jobs: OrderedDict[uuid.UUID, ImportJob] = OrderedDict()
+        self._pending = 0  # receiving + queued
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def pool_connections(self) -> int:
+        # each worker holds at most one pooled connection
+        return self.workers
+
+    def get(self, job_id: uuid.UUID) -> Optional[ImportJob]:
+        return self._jobs.get(job_id)
+
+    def recent(self) -> list[ImportJob]:
+        return list(reversed(self._jobs.values()))
+
+    def create(self, filename: Optional[str], encoding: str = "utf-8") -> ImportJob:
+        """Reserve a queue slot and a spool file for a new upload."""
+        if self._pending >= self.max_queued:
+            raise ImportQueueFull()
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        job_id = uuid.uuid4()
+        job = ImportJob(id=job_id, filename=filename, spool_path=self.spool_dir / f"{job_id}.csv",
+                        encoding=encoding)
+        self._pending += 1
+        self._jobs[job_id] = job
+        self._trim()
+        return job
+
+    def submit(self, job: ImportJob) -> None:
+        job.status = "queued"
+        self._queue.put_nowait(job)
+
+    def discard(self, job: ImportJob) -> None:
+        # the upload never completed (client went away, too large, ...)
+        self._pending -= 1
+        self._jobs.pop(job.id, None)
+        job.spool_path.unlink(missing_ok=True)
+
+    def _trim(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(0, len(self._jobs) - self.history)]:
+            del self._jobs[job_id]
+
+    async def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            self._pending -= 1
+            self._fail(job, "Server shut down before the import started")
+            job.spool_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _fail(job: ImportJob, error: str) -> None:
+        job.status, job.error = "failed", error
+        job.finished_at, job._finished = datetime.now(timezone.utc), time.monotonic()
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            self._pending -= 1
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                self._fail(job, "Server shut down during the import")
+                raise
+            except Exception as e:
+                logger.exception("Import job %s failed", job.id)
+                self._fail(job, f"{type(e).__name__}: {e}")
+            finally:
+                job.spool_path.unlink(missing_ok=True)
+                self._trim()
+
+    async def _run(self, job: ImportJob) -> None:
+        job.status = "running"
+        job.started_at, job._started = datetime.now(timezone.utc), time.monotonic()
+        reader = await asyncio.to_thread(_BatchReader, job.spool_path, job.encoding)
+        try:
+            while True:
+                batch, undecodable = await asyncio.to_thread(reader.next_batch, self.batch_rows)
+                if not batch and not undecodable:
+                    break
+                for line in undecodable:
+                    job.reject(line, UNDECODABLE.format(job.encoding))
+                if batch:
+                    await self._write_batch(job, batch)
+                job.rows_processed += len(batch) + len(undecodable)
+                job.bytes_processed = reader.bytes_read
+        finally:
+            await asyncio.to_thread(reader.close)
+        job.status = "succeeded"
+        job.finished_at, job._finished = datetime.now(timezone.utc), time.monotonic()
+
+    async def _write_batch(self, job: ImportJob, batch: list[tuple[int, dict]]) -> None:
+        try:
+            async with session_factory() as db:
+                async with db.begin():
+                    results = [(line, None if await upsert_book(db, row) else MISSING_FIELDS)
+                               for line, row in batch]
+        except DBAPIError:
+            # one bad row (or another job inserting the same ISBN) fails the whole batch:
+            # redo it with a savepoint per row so only the offending rows are rejected
+            results = await self._write_rows(batch)
+        for line, reason in results:
+            if reason is None:
+                job.rows_written += 1
+            else:
+                job.reject(line, reason)
+
+    @staticmethod
+    async def _write_rows(batch: list[tuple[int, dict]]) -> list[tuple[int, Optional[str]]]:
+        results = []
+        async with session_factory() as db:
+            async with db.begin():
+                for line, row in batch:
+                    try:
+                        async with db.begin_nested():
+                            ok = await upsert_book(db, row)
+                        results.append((line, None if ok else MISSING_FIELDS))
+                    except DBAPIError as e:
+                        results.append((line, f"database error: {type(e.orig).__name__}"))
+        return results
+
+
+import_jobs = ImportJobManager(
+    workers=IMPORT_WORKERS,
+    max_queued=IMPORT_MAX_QUEUED,
+    batch_rows=IMPORT_BATCH_ROWS,
+    spool_dir=IMPORT_SPOOL_DIR,
+    history=IMPORT_JOB_HISTORY,
+)
@@ -0,0 +1,151 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+_current_stats: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+_observers: list[Callable[[str, str, "QueryStats"], None]] = []
+_installed_engines: set[int] = set()
+
+# placeholders / literals that vary between executions of the "same" statement
+_PARAM_RE = re.compile(r"%\(\w+\)s|\$\d+|\?|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAM_LIST_RE = re.compile(r"\?(?:\s*,\s*\?)+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Reduce a SQL string to its shape: parameters and literals become `?`,
+    IN-lists collapse to a single `?...`, whitespace is normalised.
+    Two executions with the same shape are the same query with different values.
+    """
+    shape = _PARAM_RE.sub("?", statement)
+    shape = _PARAM_LIST_RE.sub("?...", shape)
+    return _SPACE_RE.sub(" ", shape).strip()
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration_ms: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, duration_ms: float) -> None:
+        self.count += 1
+        self.duration_ms += duration_ms
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """Shapes executed more than `threshold` times (likely N+1 loops)."""
+        return {shape: n for shape, n in self.shapes.items() if n > threshold}
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    Count every statement executed in the current context (task / request).
+    Statements are also added to an enclosing tracker, if any.
+    """
+    parent = _current_stats.get()
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+        if parent is not None:
+            parent.count += stats.count
+            parent.duration_ms += stats.duration_ms
+            parent.shapes.update(stats.shapes)
+
+
+@contextmanager
+def observe_requests() -> Iterator[list[tuple[str, str, QueryStats]]]:
+    """
+    Collect (method, path, stats) for every request finished by QueryCountMiddleware
+    while the block is active. Works across threads (e.g. a TestClient portal).
+    """
+    seen: list[tuple[str, str, QueryStats]] = []
+
+    def observer(method: str, path: str, stats: QueryStats) -> None:
+        seen.append((method, path, stats))
+
+    _observers.append(observer)
+    try:
+        yield seen
+    finally:
+        _observers.remove(observer)
+
+
+def install_query_counter(engine: AsyncEngine) -> None:
+    """
+    Hook statement counting into an engine. Safe to call more than once.
+    """
+    sync_engine = engine.sync_engine
+    if id(sync_engine) in _installed_engines:
+        return
+    _installed_engines.add(id(sync_engine))
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("query_started", time.perf_counter())
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(statement, (time.perf_counter() - started) * 1000)
+
+
+class QueryCountMiddleware:
+    """
+    Counts SQL statements per HTTP request.
+    With `expose_headers` the response carries `X-Query-Count` and a `Server-Timing` db entry.
+    Shapes repeated more than `warn_repeats` times within one request are logged as N+1 suspects.
+    """
+
+    def __init__(self, app, expose_headers: bool = False, warn_repeats: int = 0):
+        self.app = app
+        self.expose_headers = expose_headers
+        self.warn_repeats = warn_repeats
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start" and self.expose_headers:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-query-count", str(stats.count).encode()))
+                    headers.append((
+                        b"server-timing",
+                        f'db;dur={stats.duration_ms:.2f};desc="{stats.count} queries"'.encode(),
+                    ))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                method, path = scope["method"], scope["path"]
+                if self.warn_repeats:
+                    for shape, n in stats.repeated(self.warn_repeats).items():
+                        logger.warning("Possible N+1 on %s %s: %d x %s", method, path, n, shape)
+                for observer in list(_observers):
+                    observer(method, path, stats)
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import UUID
+
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy import select
+
+from settings import (
+    RECOMMENDATIONS_FULL_REBUILD_SECONDS,
+    RECOMMENDATIONS_REFRESH_SECONDS,
+    RECOMMENDATIONS_TOP_K,
+)
+from src.models.RentalReq import Rental
+from src.utils.db_utils import session_factory
+
+logger = logging.getLogger(__name__)
+
+# re-read this much history on each refresh so rentals committed late aren't missed;
+# pairs already in the matrix are ignored, so the overlap is harmless
+REFRESH_OVERLAP = timedelta(minutes=5)
+STREAM_BATCH = 50_000
+
+
+class CoRentalIndex:
+    """
+    Sparse "patrons also borrowed" model.
+
+    B is the binary users x books incidence matrix (did user u ever rent book b) and
+    C = B.T @ B, with the diagonal removed, counts how many patrons rented both books.
+    New rentals are folded in with C += B.T@D + D.T@B + D.T@D (D = new pairs only),
+    and the top-k neighbours of each affected row are precomputed, so a lookup is
+    just a list index.
+    """
+
+    def __init__(self, top_k: int = 50):
+        self.top_k = top_k
+        self.book_ids: list[UUID] = []
+        self._book_index: dict[UUID, int] = {}
+        self._user_index: dict[UUID, int] = {}
+        self._B = sp.csr_matrix((0, 0), dtype=np.int32)
+        self._C = sp.csr_matrix((0, 0), dtype=np.int32)
+        # per book: (neighbour indices, scores); entries are replaced, never mutated,
+        # so readers on the event loop never see a half-updated row
+        self._top: list[Optional[tuple[np.ndarray, np.ndarray]]] = []
+
+    @property
+    def pairs(self) -> int:
+        return self._B.nnz
+
+    def _intern(self, index: dict, ids, owner: Optional[list] = None) -> np.ndarray:
+        out = np.empty(len(ids), dtype=np.int64)
+        for i, key in enumerate(ids):
+            idx = index.get(key)
+            if idx is None:
+                idx = index[key] = len(index)
+                if owner is not None:
+                    owner.append(key)
+            out[i] = idx
+        return out
+
+    def add_rentals(self, user_ids: list[UUID], book_ids: list[UUID]) -> int:
+        """
+        Fold (user, book) rentals into the model. Returns the number of new distinct pairs.
+        """
+        if not user_ids:
+            return 0
+        users = self._intern(self._user_index, user_ids)
+        books = self._intern(self._book_index, book_ids, self.book_ids)
+        shape = (len(self._user_index), len(self._book_index))
+
+        B = self._B
+        if B.shape != shape:
+            B = B.copy()
+            B.resize(shape)
+        C = self._C
+        if C.shape != (shape[1], shape[1]):
+            C = C.copy()
+            C.resize((shape[1], shape[1]))
+
+        D = sp.csr_matrix((np.ones(len(users), dtype=np.int32), (users, books)), shape=shape)
+        D.sum_duplicates()
+        D.data[:] = 1
+        D = D - D.multiply(B)  # drop pairs we already know
+        D.eliminate_zeros()
+        if D.nnz == 0:
+            self._B, self._C = B, C
+            self._top.extend([None] * (shape[1] - len(self._top)))
+            return 0
+
+        Bt, Dt = B.T.tocsr(), D.T.tocsr()
+        delta = (Bt @ D + Dt @ B + Dt @ D).tocsr()
+        delta = (delta - sp.diags(delta.diagonal(), dtype=delta.dtype)).tocsr()
+        delta.eliminate_zeros()
+
+        self._B = (B + D).tocsr()
+        self._C = (C + delta).tocsr()
+        self._top.extend([None] * (shape[1] - len(self._top)))
+        self._update_top(np.unique(delta.nonzero()[0]))
+        return int(D.nnz)
+
+    def _update_top(self, rows: np.ndarray) -> None:
+        C, k = self._C, self.top_k
+        indptr, indices, data = C.indptr, C.indices, C.data
+        for r in rows:
+            start, end = indptr[r], indptr[r + 1]
+            cols, scores = indices[start:end], data[start:end]
+            if len(scores) > k:
+                keep = np.argpartition(scores, -k)[-k:]
+                cols, scores = cols[keep], scores[keep]
+            order = np.argsort(-scores, kind="stable")
+            self._top[r] = (cols[order].copy(), scores[order].copy())
+
+    def related(self, book_id: UUID, k: int = 10) -> list[tuple[UUID, int]]:
+        idx = self._book_index.get(book_id)
+        if idx is None or idx >= len(self._top) or self._top[idx] is None:
+            return []
+        cols, scores = self._top[idx]
+        return [(self.book_ids[c], int(s)) for c, s in zip(cols[:k], scores[:k])]
+
+
+class RecommendationService:
+    """
+    Keeps a CoRentalIndex in memory for GET /books/{book_id}/related.
+    Every RECOMMENDATIONS_REFRESH_SECONDS it streams rentals newer than the last
+    watermark into the index; every RECOMMENDATIONS_FULL_REBUILD_SECONDS it rebuilds
+    from scratch (picking up deleted books/users) and swaps the new index in.
+    Matrix work runs in a thread so the event loop keeps serving lookups.
+    """
+
+    # pooled connections held in the background (admission control leaves them free)
+    pool_connections = 1
+
+    def __init__(self, top_k: int, refresh_seconds: float, full_rebuild_seconds: float):
+        self.top_k = top_k
+        self.refresh_seconds = refresh_seconds
+        self.full_rebuild_seconds = full_rebuild_seconds
+        self.index = CoRentalIndex(top_k)
+        self.watermark: Optional[datetime] = None
+        self.last_build_at: Optional[float] = None
+        self.last_refresh_ms: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                stale = self.last_build_at is None or time.monotonic() - self.last_build_at > self.full_rebuild_seconds
+                await self.refresh(full=stale)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Recommendation refresh failed")
+            await asyncio.sleep(self.refresh_seconds)
+
+    async def refresh(self, full: bool = False) -> int:
+        started = time.perf_counter()
+        since = None if full or self.watermark is None else self.watermark - REFRESH_OVERLAP
+        index = CoRentalIndex(self.top_k) if full else self.index
+
+        stmt = select(Rental.user_id, Rental.book_id, Rental.rented_at)
+        if since is not None:
+            stmt = stmt.where(Rental.rented_at >= since)
+
+        added = 0
+        watermark = self.watermark if not full else None
+        async with session_factory() as db:
+            result = await db.stream(stmt.execution_options(yield_per=STREAM_BATCH))
+            async for rows in result.partitions(STREAM_BATCH):
+                users = [r[0] for r in rows]
+                books = [r[1] for r in rows]
+                newest = max(r[2] for r in rows)
+                watermark = newest if watermark is None else max(watermark, newest)
+                added += await asyncio.to_thread(index.add_rentals, users, books)
+
+        self.index = index
+        self.watermark = watermark
+        if full:
+            self.last_build_at = time.monotonic()
+        self.last_refresh_ms = (time.perf_counter() - started) * 1000
+        return added
+
+    def related(self, book_id: UUID, k: int) -> list[tuple[UUID, int]]:
+        return self.index.related(book_id, k)
+
+
+recommendations = RecommendationService(
+    top_k=RECOMMENDATIONS_TOP_K,
+    refresh_seconds=RECOMMENDATIONS_REFRESH_SECONDS,
+    full_rebuild_seconds=RECOMMENDATIONS_FULL_REBUILD_SECONDS,
+)
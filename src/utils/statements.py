@@ -0,0 +1,60 @@
+"""
+Hot-path statements, built once at import time with named bind parameters.
+
+Building a select() per request and generating its cache key costs tens of
+microseconds; a module-level construct is reused as-is, so SQLAlchemy goes straight
+to its compiled cache. The SQL text is then identical on every execution, which lets
+psycopg turn it into a server-side prepared statement (see PG_PREPARE_THRESHOLD).
+Execute with `await db.execute(STATEMENT, {"param": value})`.
+"""
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import bindparam, select
+
+from src.models.Books import Books
+from src.models.RentalReq import Rental
+from src.models.Users import Users
+
+# books
+BOOK_BY_ISBN = select(Books).where(Books.isbn == bindparam("isbn"))
+ISBN_TAKEN = select(Books.id).where(Books.isbn == bindparam("isbn")).limit(1)
+BOOK_BY_TITLE_AUTHOR = select(Books).where(Books.title == bindparam("title"), Books.author == bindparam("author"))
+
+# users
+EMAIL_TAKEN = select(Users.id).where(Users.email == bindparam("email")).limit(1)
+EMAIL_TAKEN_BY_OTHER = (
+    select(Users.id)
+    .where(Users.email == bindparam("email"), Users.id != bindparam("user_id"))
+    .limit(1)
+)
+
+# rentals
+ACTIVE_RENTAL_FOR = (
+    select(Rental)
+    .where(
+        Rental.user_id == bindparam("user_id"),
+        Rental.book_id == bindparam("book_id"),
+        Rental.returned_at.is_(None),
+    )
+    .order_by(Rental.rented_at.desc())
+    .limit(1)
+)
+
+
+@lru_cache(maxsize=None)
+def list_rentals_stmt(active: Optional[bool], by_user: bool, by_book: bool):
+    """
+    One prebuilt statement per filter combination (at most 12);
+    bind `user_id` / `book_id` when the matching flag is set.
+    """
+    stmt = select(Rental)
+    if active is True:
+        stmt = stmt.where(Rental.returned_at.is_(None))
+    if active is False:
+        stmt = stmt.where(Rental.returned_at.is_not(None))
+    if by_user:
+        stmt = stmt.where(Rental.user_id == bindparam("user_id"))
+    if by_book:
+        stmt = stmt.where(Rental.book_id == bindparam("book_id"))
+    return stmt.order_by(Rental.rented_at.desc())
@@ -0,0 +1,57 @@
+import uuid
+
+import psycopg
+import pytest
+from fastapi.testclient import TestClient
+
+from src.utils.db_utils import get_psycopg_conninfo
+
+pytest_plugins = ["tests.plugins.query_budget"]
+
+
+def _postgres_available() -> bool:
+    try:
+        with psycopg.connect(get_psycopg_conninfo(), connect_timeout=2):
+            return True
+    except psycopg.OperationalError:
+        return False
+
+
+@pytest.fixture(scope="session")
+def postgres() -> None:
+    """Skip tests that need the database configured by POSTGRES_* when it is not reachable."""
+    if not _postgres_available():
+        pytest.skip("Postgres is not reachable (check the POSTGRES_* settings)")
+
+
+@pytest.fixture(scope="session")
+def client(postgres):
+    """The app with its lifespan running, against the database configured by POSTGRES_*."""
+    from main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def book(client) -> dict:
+    res = client.post("/books", json={
+        "title": "Test book",
+        "author": "Test author",
+        "published_year": 2000,
+        "isbn": uuid.uuid4().hex[:13],
+        "total_copies": 3,
+    })
+    assert res.status_code == 201, res.text
+    return res.json()
+
+
+@pytest.fixture
+def user(client) -> dict:
+    res = client.post("/users", json={
+        "name": "Test user",
+        "email": f"{uuid.uuid4().hex}@example.com",
+        "phone": "0123456789",
+    })
+    assert res.status_code == 201, res.text
+    return res.json()
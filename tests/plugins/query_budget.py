@@ -0,0 +1,52 @@
+# pytest plugin: enable with `pytest_plugins = ["tests.plugins.query_budget"]` in a conftest.py
+from contextlib import contextmanager
+from typing import Iterator
+
+import pytest
+
+from src.utils.db_utils import engine
+from src.utils.query_counter import QueryStats, install_query_counter, observe_requests
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def check_query_budget(method: str, path: str, stats: QueryStats, max_queries: int, max_repeats: int = 2) -> None:
+    """
+    Raise QueryBudgetExceeded if a request ran more than `max_queries` statements,
+    or ran any single statement shape more than `max_repeats` times (an N+1 loop).
+    """
+    problems = []
+    if stats.count > max_queries:
+        problems.append(f"{stats.count} queries (budget {max_queries})")
+    for shape, n in stats.repeated(max_repeats).items():
+        problems.append(f"{n} x {shape}")
+    if problems:
+        raise QueryBudgetExceeded(f"{method} {path}: " + "; ".join(problems))
+
+
+@contextmanager
+def assert_query_budget(max_queries: int, max_repeats: int = 2) -> Iterator[list]:
+    """
+    Every request served inside the block must stay within the budget.
+    Fails if no request went through QueryCountMiddleware, so a mis-wired test can't pass silently.
+    """
+    install_query_counter(engine)
+    with observe_requests() as seen:
+        yield seen
+    if not seen:
+        raise QueryBudgetExceeded("No requests were observed; is QueryCountMiddleware installed?")
+    for method, path, stats in seen:
+        check_query_budget(method, path, stats, max_queries, max_repeats)
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Usage (`client` is the TestClient fixture from tests/conftest.py):
+        def test_rent(client, query_budget):
+            with query_budget(max_queries=5):
+                client.post("/rent", json=payload)
+    """
+    return assert_query_budget
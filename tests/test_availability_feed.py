@@ -0,0 +1,48 @@
+from src.utils.availability_feed import AvailabilityFeed
+
+
+def _event(seq: int, book_id: str = "b1") -> dict:
+    return {"seq": seq, "book_id": book_id, "available_copies": 1, "total_copies": 1}
+
+
+def _drain(sub) -> list:
+    events = []
+    while not sub.queue.empty():
+        events.append(sub.queue.get_nowait())
+    return events
+
+
+def test_catch_up_follows_delivery_order_not_seq():
+    feed = AvailabilityFeed()
+    # T1 took seq 10 and T2 seq 11, but T2 committed (and was delivered) first
+    feed.dispatch(_event(11))
+    feed.dispatch(_event(10))
+    feed.dispatch(_event(12))
+
+    sub = feed.subscribe(last_seq=11)
+    assert [e["seq"] for e in _drain(sub)] == [10, 12]
+
+
+def test_catch_up_respects_book_filter():
+    feed = AvailabilityFeed()
+    for seq, book in ((1, "b1"), (2, "b2"), (3, "b1")):
+        feed.dispatch(_event(seq, book))
+
+    sub = feed.subscribe(book_ids={"b1"}, last_seq=1)
+    assert [e["seq"] for e in _drain(sub)] == [3]
+
+
+def test_unknown_position_resets():
+    feed = AvailabilityFeed(backlog=2)
+    for seq in (1, 2, 3):
+        feed.dispatch(_event(seq))
+
+    assert _drain(feed.subscribe(last_seq=1)) == [{"type": "reset"}]  # fell out of the backlog
+    assert _drain(feed.subscribe(last_seq=99)) == [{"type": "reset"}]  # not received here
+
+
+def test_empty_backlog_with_position_resets():
+    # e.g. the client reconnects to a freshly restarted worker
+    feed = AvailabilityFeed()
+    assert _drain(feed.subscribe(last_seq=5)) == [{"type": "reset"}]
+    assert _drain(feed.subscribe()) == []
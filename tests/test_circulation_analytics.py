@@ -0,0 +1,46 @@
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+from src.utils.circulation_analytics import CirculationSnapshot, _day
+
+
+def _snapshot(book_years, rental_years, rented_days) -> CirculationSnapshot:
+    n = len(rental_years)
+    return CirculationSnapshot(
+        taken_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        as_of=float(_day(date(2025, 1, 1))),
+        publishers=["P"],
+        book_publisher=np.zeros(len(book_years), dtype=np.int32),
+        book_published_year=np.asarray(book_years, dtype=np.int32),
+        book_copies=np.ones(len(book_years), dtype=np.int32),
+        rental_publisher=np.zeros(n, dtype=np.int32),
+        rental_published_year=np.asarray(rental_years, dtype=np.int32),
+        rented=np.asarray(rented_days, dtype=np.float64),
+        due=np.asarray(rented_days, dtype=np.int32) + 14,
+        returned=np.asarray(rented_days, dtype=np.float64) + 3,
+        quantity=np.ones(n, dtype=np.int32),
+    )
+
+
+def test_published_year_codes_start_at_the_earliest_year():
+    snap = _snapshot([1999, 2001], [2001, 1999], [_day(date(2024, 5, 1)), _day(date(2024, 6, 1))])
+
+    codes, labels = snap._codes("published_year", for_books=True)
+    assert labels == [1999, 2000, 2001]
+    assert codes.tolist() == [0, 2]
+    assert snap._codes("published_year")[0].tolist() == [2, 0]
+
+
+def test_rental_year_codes_start_at_the_earliest_year():
+    snap = _snapshot([2000], [2000, 2000], [_day(date(2023, 12, 31)), _day(date(2024, 1, 1))])
+
+    codes, labels = snap._codes("year")
+    assert labels == [2023, 2024]
+    assert codes.tolist() == [0, 1]
+
+
+def test_empty_snapshot_has_no_year_groups():
+    snap = _snapshot([], [], [])
+    assert snap._codes("published_year")[1] == []
+    assert snap._codes("year")[1] == []
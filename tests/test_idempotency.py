@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import psycopg
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from src.utils import idempotency
+from src.utils.db_utils import get_psycopg_conninfo
+from src.utils.idempotency import (
+    IdempotencyContext,
+    IdempotencyMiddleware,
+    IdempotencyStore,
+    StoredResponse,
+    record_response,
+)
+
+
+@dataclass
+class _Row(StoredResponse):
+    claim_token: str = ""
+    locked_until: Optional[float] = None
+
+
+class _StubStore(IdempotencyStore):
+    """The table as a dict; completions staged by record_response() apply on commit."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**{"ttl_seconds": 60, "lease_seconds": 60, "lru_size": 10, "cleanup_seconds": 60,
+                            **kwargs})
+        self.rows = {}
+
+    def _owned(self, ctx):
+        row = self.rows.get(ctx.scope_key)
+        return row is not None and row.claim_token == ctx.claim_token and row.status_code is None
+
+    async def claim(self, ctx):
+        now = time.time()
+        row = self.rows.get(ctx.scope_key)
+        if row is None or row.expires_at < now or (
+                row.status_code is None and row.locked_until < now and row.request_hash == ctx.request_hash):
+            self.rows[ctx.scope_key] = _Row(ctx.request_hash, None, None, None, now + self.ttl_seconds,
+                                            ctx.claim_token, now + self.lease_seconds)
+            return None
+        if row.status_code is not None:
+            self.remember(ctx.scope_key, row)
+        return row
+
+    def _complete_stmt(self, ctx, status_code, content_type, body):
+        return ctx, status_code, content_type, body
+
+    def _apply(self, ctx, status_code, content_type, body):
+        row = self.rows[ctx.scope_key]
+        row.status_code, row.content_type, row.body, row.locked_until = status_code, content_type, body, None
+
+    async def complete(self, ctx, status_code, content_type, body):
+        if not self._owned(ctx):
+            return False
+        self._apply(ctx, status_code, content_type, body)
+        self.remember(ctx.scope_key, self._stored(ctx, status_code, content_type, body))
+        return True
+
+    async def release(self, ctx):
+        if self._owned(ctx):
+            del self.rows[ctx.scope_key]
+
+
+class _Result:
+    def __init__(self, ok: bool):
+        self.ok = ok
+
+    def first(self):
+        return ("key",) if self.ok else None
+
+
+class _StubSession:
+    def __init__(self, store: _StubStore, fail_commit: bool = False):
+        self.store = store
+        self.fail_commit = fail_commit
+        self.staged = []
+
+    async def execute(self, stmt):
+        ok = self.store._owned(stmt[0])
+        if ok:
+            self.staged.append(stmt)
+        return _Result(ok)
+
+    async def commit(self):
+        if self.fail_commit:
+            raise RuntimeError("commit failed")
+        for stmt in self.staged:
+            self.store._apply(*stmt)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = _StubStore()
+    monkeypatch.setattr(idempotency, "idempotency_store", store)
+    return store
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def api(store, calls):
+    app = FastAPI()
+    app.add_middleware(IdempotencyMiddleware, store=store)
+
+    @app.post("/rent", status_code=201)
+    async def rent(payload: dict, request: Request):
+        calls.append(payload)
+        if payload.get("missing"):
+            raise HTTPException(status_code=404, detail="Book not found")
+        db = _StubSession(store, fail_commit=payload.get("fail_commit", False))
+        out = {"id": len(calls)}
+        await record_response(db, request, out, 201)
+        await db.commit()
+        return out
+
+    with TestClient(app, raise_server_exceptions=False) as c:
+        yield c
+
+
+def _rent(api, key: str, payload: dict):
+    return api.post("/rent", content=json.dumps(payload), headers={"Idempotency-Key": key,
+                                                                      "Content-Type": "application/json"})
+
+
+def _ctx(key: str, payload: dict, token: str = "other") -> IdempotencyContext:
+    request_hash = hashlib.sha256(json.dumps(payload).encode()).hexdigest()
+    return IdempotencyContext(scope_key=(key, "POST", "/rent"), request_hash=request_hash, claim_token=token)
+
+
+def test_retry_replays_recorded_response(api, store, calls):
+    first = _rent(api, "k1", {"book": 1})
+    again = _rent(api, "k1", {"book": 1})
+
+    assert first.status_code == again.status_code == 201
+    assert again.json() == first.json()
+    assert again.headers["idempotent-replayed"] == "true"
+    assert len(calls) == 1
+
+    store._lru.clear()  # another worker: replayed from the table
+    assert _rent(api, "k1", {"book": 1}).json() == first.json()
+    assert len(calls) == 1
+
+
+def test_different_body_is_rejected(api, calls):
+    _rent(api, "k1", {"book": 1})
+    res = _rent(api, "k1", {"book": 2})
+
+    assert res.status_code == 422
+    assert len(calls) == 1
+
+
+def test_response_without_writes_is_stored(api, calls):
+    assert _rent(api, "k1", {"missing": True}).status_code == 404
+    assert _rent(api, "k1", {"missing": True}).status_code == 404
+    assert len(calls) == 1
+
+
+def test_in_progress_claim_is_a_conflict(api, store, calls):
+    payload = {"book": 1}
+    asyncio.run(store.claim(_ctx("k1", payload)))
+
+    res = _rent(api, "k1", payload)
+    assert res.status_code == 409
+    assert res.headers["retry-after"] == "1"
+    assert calls == []
+
+
+def test_stale_claim_is_taken_over(api, store, calls):
+    payload = {"book": 1}
+    asyncio.run(store.claim(_ctx("k1", payload)))
+    store.rows[("k1", "POST", "/rent")].locked_until = time.time() - 1
+
+    assert _rent(api, "k1", payload).status_code == 201
+    assert len(calls) == 1
+
+
+def test_failed_commit_is_not_replayed(api, store, calls):
+    payload = {"book": 1, "fail_commit": True}
+    assert _rent(api, "k1", payload).status_code == 500
+    # recorded before the commit, so nothing may be cached and the claim is released
+    assert store.cached(("k1", "POST", "/rent")) is None
+    assert ("k1", "POST", "/rent") not in store.rows
+
+    assert _rent(api, "k1", payload).status_code == 500
+    assert len(calls) == 2
+
+
+def test_lru_drops_expired_and_oldest_entries():
+    store = _StubStore(lru_size=2)
+    entry = StoredResponse("h", 201, None, b"", time.time() + 60)
+    store.remember(("a",), StoredResponse("h", 201, None, b"", time.time() - 1))
+    assert store.cached(("a",)) is None
+
+    for key in ("a", "b", "c"):
+        store.remember((key,), entry)
+    assert store.cached(("a",)) is None
+    assert store.cached(("c",)) is entry
+
+
+def test_stale_claim_is_taken_over_in_postgres(client, book, user):
+    # a claim left behind by a request that died before recording its response
+    key = uuid.uuid4().hex
+    body = json.dumps({"user_id": user["id"], "book_id": book["id"]}).encode()
+    with psycopg.connect(get_psycopg_conninfo()) as conn:
+        now = datetime.now(timezone.utc)
+        conn.execute(
+            "INSERT INTO idempotency_keys (key, method, path, request_hash, claim_token, locked_until, expires_at) "
+            "VALUES (%s, 'POST', '/rent', %s, 'dead', %s, %s)",
+            (key, hashlib.sha256(body).hexdigest(), now - timedelta(seconds=1), now + timedelta(hours=1)),
+        )
+
+    headers = {"Idempotency-Key": key, "Content-Type": "application/json"}
+    first = client.post("/rent", content=body, headers=headers)
+    again = client.post("/rent", content=body, headers=headers)
+
+    assert first.status_code == 201, first.text
+    assert again.json() == first.json()
+    assert again.headers["idempotent-replayed"] == "true"
@@ -0,0 +1,186 @@
+import time
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api import imports
+from src.utils.book_import import sniff_delimiter
+from src.utils.import_jobs import ImportJobManager, ImportQueueFull, _BatchReader
+
+# Book-Crossing style: ';'-separated, quoted, Latin-1
+BOOK_CROSSING = (
+    '"ISBN";"Book-Title";"Book-Author";"Year-Of-Publication";"Publisher"\n'
+    '"0060929790";"One Hundred Years of Solitude";"Gabriel García Márquez";"1998";"Harper"\n'
+    '"0451524934";"1984";"George Orwell";"1990";"Signet"\n'
+).encode("latin-1")
+CSV = b"title,author,published_year\nA,B,2001\n"
+
+
+def _read_all(reader: _BatchReader, size: int = 100):
+    rows, undecodable = [], []
+    while True:
+        batch, bad = reader.next_batch(size)
+        if not batch and not bad:
+            return rows, undecodable
+        rows += batch
+        undecodable += bad
+
+
+def test_sniff_delimiter_does_not_decode(tmp_path):
+    path = tmp_path / "books.csv"
+    path.write_bytes(BOOK_CROSSING)
+    assert sniff_delimiter(path) == ";"
+
+
+def test_declared_encoding_is_used(tmp_path):
+    path = tmp_path / "books.csv"
+    path.write_bytes(BOOK_CROSSING)
+    reader = _BatchReader(path, "latin-1")
+    rows, undecodable = _read_all(reader, size=1)
+    reader.close()
+
+    assert undecodable == []
+    assert [line for line, _ in rows] == [2, 3]
+    assert rows[0][1]["Book-Author"] == "Gabriel García Márquez"
+    assert reader.bytes_read == len(BOOK_CROSSING)
+
+
+def test_undecodable_rows_are_set_aside(tmp_path):
+    path = tmp_path / "books.csv"
+    path.write_bytes(BOOK_CROSSING)
+    reader = _BatchReader(path, "utf-8")
+    rows, undecodable = _read_all(reader)
+    reader.close()
+
+    assert undecodable == [2]
+    assert [(line, row["Book-Title"]) for line, row in rows] == [(3, "1984")]
+
+
+def test_multi_line_row_with_a_bad_line_is_set_aside(tmp_path):
+    path = tmp_path / "books.csv"
+    path.write_bytes(
+        b"title,author,published_year\n"
+        b'"A title","Multi\nline caf\xe9",2001\n'
+        b"Another,Author,2002\n"
+    )
+    reader = _BatchReader(path)
+    rows, undecodable = _read_all(reader)
+    reader.close()
+
+    assert undecodable == [3]
+    assert [line for line, _ in rows] == [4]
+
+
+def test_undecodable_header_fails(tmp_path):
+    path = tmp_path / "books.csv"
+    path.write_bytes(b"t\xeftle,author,published_year\nA,B,2001\n")
+    reader = _BatchReader(path)
+    with pytest.raises(ValueError, match="header is not valid utf-8 text"):
+        reader.next_batch(10)
+    reader.close()
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return ImportJobManager(workers=1, max_queued=2, batch_rows=2, spool_dir=str(tmp_path), history=1)
+
+
+def test_queue_slots_are_reserved_and_returned(manager):
+    first = manager.create("a.csv")
+    manager.create("b.csv")
+    with pytest.raises(ImportQueueFull):
+        manager.create("c.csv")
+
+    first.spool_path.write_bytes(b"partial")
+    manager.discard(first)
+    assert manager.get(first.id) is None
+    assert not first.spool_path.exists()
+    manager.create("c.csv")
+
+
+def test_history_keeps_unfinished_jobs(manager):
+    done = manager.create("done.csv")
+    done.status = "succeeded"
+    running = manager.create("running.csv")
+    running.status = "running"
+    manager._pending = 0
+
+    manager.create("new.csv")
+    assert manager.get(done.id) is None
+    assert manager.get(running.id) is running
+
+
+@pytest.fixture
+def api(monkeypatch, manager):
+    monkeypatch.setattr(imports, "import_jobs", manager)
+    monkeypatch.setattr(imports, "IMPORT_MAX_UPLOAD_BYTES", 64)
+    app = FastAPI()
+    app.include_router(imports.router)
+    with TestClient(app) as c:
+        yield c
+
+
+def test_upload_is_queued(api, manager):
+    res = api.post("/imports?filename=books.csv", content=CSV, headers={"Content-Type": "text/csv; charset=latin-1"})
+
+    assert res.status_code == 202, res.text
+    job = manager.get(uuid.UUID(res.json()["id"]))
+    assert res.headers["location"] == f"/imports/{job.id}"
+    assert (job.status, job.encoding, job.bytes_received) == ("queued", "iso8859-1", len(CSV))
+    assert job.spool_path.read_bytes() == CSV
+
+
+def test_queue_full_is_503(api):
+    for _ in range(2):
+        assert api.post("/imports", content=CSV).status_code == 202
+    res = api.post("/imports", content=CSV)
+    assert res.status_code == 503
+    assert res.headers["retry-after"] == "30"
+
+
+def test_empty_upload_is_400(api, manager):
+    assert api.post("/imports", content=b"").status_code == 400
+    assert manager.recent() == []
+
+
+def test_too_large_upload_is_413(api, manager):
+    # without a Content-Length the limit is enforced while spooling
+    res = api.post("/imports", content=iter([CSV, CSV]))
+    assert res.status_code == 413
+    assert manager.recent() == []
+    assert list(manager.spool_dir.iterdir()) == []
+
+
+def test_unknown_encoding_is_400(api):
+    assert api.post("/imports?encoding=klingon", content=CSV).status_code == 400
+
+
+def _wait_for(client, job_id: str) -> dict:
+    for _ in range(100):
+        job = client.get(f"/imports/{job_id}").json()
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"import {job_id} did not finish")
+
+
+def test_only_bad_rows_are_rejected(client):
+    tag = uuid.uuid4().hex[:8]
+    body = (
+        "isbn,title,author,published_year\n"
+        f"{tag}-1,Good {tag},Author,2001\n"
+        f"{tag}-2,Overflow {tag},Author,99999999999\n"  # integer out of range: fails the batch
+        f"{tag}-3,,Author,2003\n"
+        f"{tag}-4,Also good {tag},Author,2004\n"
+    ).encode()
+    res = client.post("/imports", content=body, headers={"Content-Type": "text/csv"})
+    assert res.status_code == 202, res.text
+
+    job = _wait_for(client, res.json()["id"])
+    assert job["status"] == "succeeded", job["error"]
+    assert (job["rows_processed"], job["rows_written"], job["rows_rejected"]) == (4, 2, 2)
+    assert [r["line"] for r in job["reject_samples"]] == [3, 4]
+    assert job["reject_samples"][0]["reason"].startswith("database error")
+    assert (job["bytes_processed"], job["progress"]) == (len(body), 1.0)
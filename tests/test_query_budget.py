@@ -0,0 +1,59 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from src.utils.db_utils import get_database_url
+from src.utils.query_counter import QueryCountMiddleware, install_query_counter
+from src.utils.statements import BOOK_BY_ISBN
+from tests.plugins.query_budget import QueryBudgetExceeded
+
+
+@pytest.fixture
+def n_plus_one_client(postgres):
+    # its own app and engine, so the production app is left untouched
+    test_engine = create_async_engine(get_database_url(), poolclass=NullPool)
+    install_query_counter(test_engine)
+    sessions = async_sessionmaker(bind=test_engine)
+    app = FastAPI()
+    app.add_middleware(QueryCountMiddleware)
+
+    # an N+1 on purpose: one lookup per ISBN instead of a single IN query
+    @app.get("/n-plus-one")
+    async def n_plus_one():
+        async with sessions() as db:
+            for isbn in ("a", "b", "c"):
+                await db.execute(BOOK_BY_ISBN, {"isbn": isbn})
+        return {}
+
+    with TestClient(app) as c:
+        yield c
+
+
+def test_rent_within_budget(client, query_budget, book, user):
+    # book, user, rental insert, book update, pg_notify, rental refresh
+    with query_budget(max_queries=6):
+        res = client.post("/rent", json={"user_id": user["id"], "book_id": book["id"]})
+    assert res.status_code == 201, res.text
+
+
+def test_return_within_budget(client, query_budget, book, user):
+    rental = client.post("/rent", json={"user_id": user["id"], "book_id": book["id"]}).json()
+    # rental, book, rental update, book update, pg_notify, rental refresh
+    with query_budget(max_queries=6):
+        res = client.post("/return", json={"user_id": user["id"], "book_id": book["id"]})
+    assert res.status_code == 200, res.text
+    assert res.json()["id"] == rental["id"]
+
+
+def test_repeated_shape_fails_budget(n_plus_one_client, query_budget):
+    with pytest.raises(QueryBudgetExceeded, match="3 x SELECT books"):
+        with query_budget(max_queries=10):
+            n_plus_one_client.get("/n-plus-one")
+
+
+def test_unobserved_block_fails(client, query_budget):
+    with pytest.raises(QueryBudgetExceeded, match="No requests were observed"):
+        with query_budget(max_queries=10):
+            pass
@@ -0,0 +1,46 @@
+import random
+from collections import defaultdict
+from uuid import uuid4
+
+from src.utils.recommendations import CoRentalIndex
+
+
+def _brute_force(pairs) -> dict:
+    # co-rental counts: distinct patrons who rented both books
+    readers = defaultdict(set)
+    for user, book in pairs:
+        readers[book].add(user)
+    return {
+        (a, b): len(readers[a] & readers[b])
+        for a in readers for b in readers
+        if a != b and readers[a] & readers[b]
+    }
+
+
+def test_batches_match_brute_force():
+    rng = random.Random(7)
+    users = [uuid4() for _ in range(40)]
+    books = [uuid4() for _ in range(25)]
+    # repeats within and across batches, and books/users that first appear late
+    rentals = [(rng.choice(users[:20 + i // 10]), rng.choice(books[:10 + i // 10])) for i in range(150)]
+
+    index = CoRentalIndex(top_k=len(books))
+    added = 0
+    for start in range(0, len(rentals), 37):
+        batch = rentals[start:start + 37]
+        added += index.add_rentals([u for u, _ in batch], [b for _, b in batch])
+
+    assert added == index.pairs == len(set(rentals))
+    expected = _brute_force(rentals)
+    got = {(book, other): score for book in books for other, score in index.related(book, k=len(books))}
+    assert got == expected
+
+
+def test_top_k_keeps_the_highest_scores():
+    index = CoRentalIndex(top_k=1)
+    a, b, c = uuid4(), uuid4(), uuid4()
+    u1, u2 = uuid4(), uuid4()
+    index.add_rentals([u1, u1, u1, u2, u2], [a, b, c, a, b])
+
+    assert index.related(a) == [(b, 2)]
+    assert index.related(uuid4()) == []
@@ -0,0 +1,39 @@
+import pyarrow.parquet as pq
+
+from commands.snapshot.main import _parse_block, _to_csv, arrow_schema
+
+BOOK_ID = "0f8b6b1c2d3e4f5a6b7c8d9e0f1a2b3c"
+EPOCH_US = 1_700_000_000_000_000
+
+# rendered the way `COPY (SELECT <export exprs>) TO STDOUT WITH (FORMAT csv)` does:
+# NULL is an unquoted empty field, '' is "", other strings are unquoted
+POSTGRES_BLOCK = (
+    f'{BOOK_ID},NULL,Nan,1999,N/A,nan,"",n/a,,3,2,{EPOCH_US},{EPOCH_US}\n'
+).encode()
+
+
+def test_postgres_null_markers_are_values():
+    row = _parse_block(POSTGRES_BLOCK, arrow_schema("books")).to_pylist()[0]
+    assert row["title"] == "NULL"
+    assert row["author"] == "Nan"
+    assert row["publisher"] == "N/A"
+    assert row["isbn"] == "nan"
+    assert row["image_url_s"] == ""
+    assert row["image_url_m"] == "n/a"
+    assert row["image_url_l"] is None
+
+
+def test_round_trip_through_parquet_and_copy_csv(tmp_path):
+    schema = arrow_schema("books")
+    exported = _parse_block(POSTGRES_BLOCK, schema)
+    pq.write_table(exported, tmp_path / "books.parquet")
+
+    restored = pq.ParquetFile(tmp_path / "books.parquet").read()
+    assert restored.equals(exported)
+
+    # COPY ... FROM STDIN (FORMAT csv) reads only unquoted empty fields as NULL
+    (batch,) = restored.to_batches()
+    assert _to_csv(batch) == (
+        f'"{BOOK_ID}","NULL","Nan","1999","N/A","nan","","n/a",,"3","2",'
+        '"2023-11-14 22:13:20.000000Z","2023-11-14 22:13:20.000000Z"\n'
+    ).encode()